@@ -0,0 +1,437 @@
+# -*- coding: utf-8 -*-
+"""
+Almacén DuckDB: consultas de los gráficos fuera de memoria
+
+Motor alternativo a las tablas en memoria (MOTOR_DATOS=duckdb). Las
+licitaciones y sus items se guardan en un archivo DuckDB local
+(cache/almacen-<huella>.duckdb) y cada callback resuelve sus filtros y
+agrupaciones con una consulta SQL sobre ese archivo: el proceso solo tiene en
+memoria el resultado agregado (por día, mes y tipo, o por región) y los
+valores distintos de los filtros, no las filas, así la memoria no crece con
+la historia cargada. Los gráficos son los mismos que con el motor en memoria.
+
+- el almacén se construye una vez por conjunto de volcados (la fuente de
+  carga_datos.py más los volcados de INGESTA_DIR, en ese orden), por bloques:
+  cada bloque se aplana y normaliza como en la carga en memoria y se inserta
+  en el archivo. Si un CodigoExterno aparece más de una vez se conserva la
+  versión con fecha_detalle_actualizado más reciente y, con la misma fecha, la
+  última, como en carga_datos.deduplicar y en la ingesta en memoria
+- las licitaciones quedan ordenadas por FechaPublicacion (los filtros de fecha
+  descartan bloques completos del archivo por sus mínimos y máximos) y con una
+  columna Texto con las palabras de NombreLicitacion, Descripcion y los
+  NombreProducto de sus items, plegadas como en texto.py, para el filtro de
+  palabras clave
+- con volcados nuevos en INGESTA_DIR se construye en segundo plano el almacén
+  de la nueva combinación y se publica al terminar; no hay actualización
+  incremental
+
+Requiere el paquete duckdb; no usa ningún servicio externo. Con varios
+workers de gunicorn conviene construir el almacén antes de iniciarlos (si
+no, cada worker lo construye).
+
+Configuración por variables de entorno:
+
+- MOTOR_DATOS: "duckdb" usa el almacén ("pandas", el motor en memoria, por defecto)
+- DUCKDB_MEMORIA: límite de memoria de DuckDB por proceso ("1GB" por defecto)
+- DUCKDB_HILOS: hilos de DuckDB por proceso (por defecto, los de DuckDB)
+
+Uso como script para construir el almacén:
+
+    python almacen.py [ruta.json|ruta.zip|carpeta|"patrón*.zip"]
+"""
+# librerías
+from __future__ import annotations
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from carga_datos import (
+    DIR_CACHE,
+    TAM_BLOQUE,
+    _bloques,
+    aplanar,
+    eliminar_versiones_antiguas,
+    expandir_fuentes,
+    leer_detalles,
+    normalizar,
+)
+from catalogos import agregar_catalogos
+from indices import BuscadorOpciones
+from ingesta import Ingesta, huella_conjunto
+from texto import tokenizar
+
+MOTOR_DATOS = os.environ.get("MOTOR_DATOS", "pandas")
+DUCKDB_MEMORIA = os.environ.get("DUCKDB_MEMORIA", "1GB")
+DUCKDB_HILOS = int(os.environ.get("DUCKDB_HILOS", 0)) or None
+
+# columnas de filtro de las licitaciones (Categoria está en los items)
+COLUMNAS_FILTRO = ("Region", "Estado", "Organismo")
+
+# muestra del scatter: celdas por eje de la grilla log-log y multiplicador del
+# hash de Fila que ordena los puntos dentro de cada celda (los mismos en
+# app.muestra_estratificada, así los dos motores toman la misma muestra)
+CELDAS_MUESTRA = 40
+HASH_MUESTRA = 2654435761
+
+# esquema de las tablas de carga, con el volcado (Fuente) y la posición de
+# cada licitación en la carga (Orden); los items llevan su propia posición
+# (Orden) y la de su licitación (Licitacion)
+ESQUEMA_LICITACIONES = """
+    CodigoExterno VARCHAR, NombreLicitacion VARCHAR, Descripcion VARCHAR, Region VARCHAR,
+    Organismo VARCHAR, Estado VARCHAR, MontoEstimado DOUBLE, FechaPublicacion TIMESTAMP,
+    FechaCierre TIMESTAMP, TiempoDuracionContrato INTEGER, UnidadTiempoDuracionContrato TINYINT,
+    CodigoTipo TINYINT, Tipo VARCHAR, ComunaComprador VARCHAR, NombreUnidad VARCHAR,
+    FechaActualizacion TIMESTAMP, unidad_format DOUBLE, Texto VARCHAR, Fuente INTEGER, Orden BIGINT
+"""
+ESQUEMA_ITEMS = """
+    CodigoExterno VARCHAR, CodigoProducto INTEGER, NombreProducto VARCHAR, CantidadProducto FLOAT,
+    Categoria VARCHAR, Orden BIGINT, Licitacion BIGINT
+"""
+
+logger = logging.getLogger(__name__)
+
+
+def _configuracion() -> dict:
+    configuracion = {"memory_limit": DUCKDB_MEMORIA}
+    if DUCKDB_HILOS:
+        configuracion["threads"] = DUCKDB_HILOS
+    return configuracion
+
+
+def ruta_almacen(huella: str) -> str:
+    return os.path.join(DIR_CACHE, f"almacen-{huella}.duckdb")
+
+
+def _texto_busqueda(licitaciones: pd.DataFrame, items: pd.DataFrame) -> pd.Series:
+    # palabras de cada licitación (nombre, descripción y productos de sus items),
+    # sin repetir y precedidas de un espacio: " palabra" marca el inicio de una palabra
+    productos = (
+        items.dropna(subset=["NombreProducto"])
+        .groupby("CodigoExterno", sort=False)["NombreProducto"].agg(" ".join)
+    )
+    textos = (
+        licitaciones["NombreLicitacion"].fillna("") + " " + licitaciones["Descripcion"].fillna("") + " "
+        + licitaciones["CodigoExterno"].map(productos).fillna("")
+    )
+    return textos.map(lambda texto: " " + " ".join(dict.fromkeys(tokenizar(texto))))
+
+
+def construir_almacen(fuentes: list[str], destino: str, tam_bloque: int = TAM_BLOQUE) -> None:
+    # carga por bloques en un archivo de trabajo y copia de las versiones
+    # vigentes, ordenadas, al almacén; la memoria depende del tamaño del bloque
+    import duckdb
+
+    os.makedirs(os.path.dirname(destino) or ".", exist_ok=True)
+    temporal = f"{destino}.{os.getpid()}.tmp"
+    trabajo = f"{destino}.{os.getpid()}.carga.tmp"
+    for ruta in (temporal, trabajo):
+        if os.path.exists(ruta):
+            os.remove(ruta)
+    with duckdb.connect(trabajo, config=_configuracion()) as con:
+        con.execute(f"CREATE TABLE licitaciones_volcados ({ESQUEMA_LICITACIONES})")
+        con.execute(f"CREATE TABLE items_volcados ({ESQUEMA_ITEMS})")
+        orden_licitaciones = orden_items = 0
+        for fuente, ruta in enumerate(fuentes):
+            for bloque in _bloques(leer_detalles(ruta), tam_bloque):
+                licitaciones, items = aplanar(bloque)
+                n = len(licitaciones["CodigoExterno"])
+                if not n:
+                    continue
+                licitaciones, items = normalizar(pd.DataFrame(licitaciones), pd.DataFrame(items))
+                # Orden sale de la posición en el bloque antes de la ventana de
+                # fechas, la misma que _fila de los items
+                licitaciones = licitaciones.assign(
+                    Texto=_texto_busqueda(licitaciones, items),
+                    Fuente=fuente,
+                    Orden=licitaciones.index.to_numpy() + orden_licitaciones,
+                )
+                items = items.assign(
+                    Orden=np.arange(orden_items, orden_items + len(items)),
+                    Licitacion=items["_fila"] + orden_licitaciones,
+                ).drop(columns="_fila")
+                orden_licitaciones += n
+                orden_items += len(items)
+                con.register("bloque_licitaciones", licitaciones)
+                con.register("bloque_items", items)
+                con.execute("INSERT INTO licitaciones_volcados BY NAME SELECT * FROM bloque_licitaciones")
+                con.execute("INSERT INTO items_volcados BY NAME SELECT * FROM bloque_items")
+                con.unregister("bloque_licitaciones")
+                con.unregister("bloque_items")
+        con.execute("ATTACH '{}' AS destino".format(temporal.replace("'", "''")))
+        # una versión por CodigoExterno: la de fecha de actualización más
+        # reciente y, sin fecha o con la misma fecha, la última cargada (como
+        # carga_datos.deduplicar).
+        # Fila es la posición en el orden por fecha (como las tablas en memoria)
+        con.execute("""
+            CREATE TABLE destino.licitaciones AS
+            WITH vigentes AS (
+                SELECT * FROM licitaciones_volcados
+                WHERE FechaPublicacion IS NOT NULL
+                QUALIFY row_number() OVER (
+                    PARTITION BY CodigoExterno
+                    ORDER BY FechaActualizacion DESC NULLS LAST, Fuente DESC, Orden DESC
+                ) = 1
+            )
+            SELECT row_number() OVER (ORDER BY FechaPublicacion, Orden) - 1 AS Fila, *
+            FROM vigentes
+            ORDER BY Fila
+        """)
+        # items de la versión conservada
+        con.execute("""
+            CREATE TABLE destino.items AS
+            SELECT i.* EXCLUDE (Orden, Licitacion) FROM items_volcados i
+            SEMI JOIN destino.licitaciones l ON i.Licitacion = l.Orden
+            ORDER BY i.Orden
+        """)
+        con.execute("ALTER TABLE destino.licitaciones DROP COLUMN Fuente")
+        con.execute("ALTER TABLE destino.licitaciones DROP COLUMN Orden")
+        con.execute("DETACH destino")
+    os.remove(trabajo)
+    # reemplazo atómico: otros procesos nunca ven un almacén a medio escribir
+    os.replace(temporal, destino)
+    # eliminar almacenes de conjuntos anteriores (se conservan los más recientes)
+    eliminar_versiones_antiguas(destino, ("almacen",))
+
+
+def _en(columna: str, valores) -> tuple[str, list]:
+    return f"{columna} IN ({', '.join('?' * len(valores))})", list(valores)
+
+
+def condiciones(filtros: tuple) -> tuple[str, list]:
+    # WHERE de las licitaciones para (región, estado, organismo, categoría,
+    # desde, hasta, palabras clave); las fechas ya son los límites del panel
+    # (hasta excluida, opcional) y cada filtro puede ser vacío
+    region_sel, estado_sel, org_sel, cat_sel, desde, hasta, palabras = filtros
+    partes, parametros = [], []
+    if desde is not None:
+        partes.append("FechaPublicacion >= ?")
+        parametros.append(desde)
+    if hasta is not None:
+        partes.append("FechaPublicacion < ?")
+        parametros.append(hasta)
+    for columna, valores in zip(COLUMNAS_FILTRO, (region_sel, estado_sel, org_sel)):
+        if valores:
+            condicion, valores = _en(columna, valores)
+            partes.append(condicion)
+            parametros += valores
+    if cat_sel:
+        condicion, valores = _en("Categoria", cat_sel)
+        partes.append(f"CodigoExterno IN (SELECT CodigoExterno FROM items WHERE {condicion})")
+        parametros += valores
+    # cada palabra como prefijo de alguna palabra de la licitación
+    for palabra in tokenizar(palabras):
+        partes.append("Texto LIKE ?")
+        parametros.append(f"% {palabra}%")
+    return " AND ".join(partes) or "TRUE", parametros
+
+
+class AlmacenDuckDB:
+    # conjunto de datos consultado en el archivo DuckDB; en memoria solo quedan
+    # los valores distintos de los filtros y el rango de fechas
+
+    def __init__(self, ruta: str, version: str, volcados: tuple[str, ...] = ()):
+        import duckdb
+
+        self.ruta = ruta
+        self.version = version
+        self.volcados = tuple(volcados)
+        self._local = threading.local()
+        self._pid = None
+        self._conexion_base = None
+        self._conexion_lock = threading.Lock()
+        # valores de los filtros con su número de licitaciones; la conexión
+        # de lectura se cierra, cada proceso abre la suya al consultar (no se
+        # comparte con los workers creados con fork)
+        with duckdb.connect(ruta, read_only=True, config=_configuracion()) as con:
+            self.frecuencias = {
+                columna: dict(con.execute(
+                    f"SELECT {columna}, count(*) FROM licitaciones WHERE {columna} IS NOT NULL GROUP BY 1"
+                ).fetchall())
+                for columna in COLUMNAS_FILTRO
+            }
+            self.frecuencias["Categoria"] = dict(con.execute(
+                "SELECT Categoria, count(DISTINCT CodigoExterno) FROM items WHERE Categoria IS NOT NULL GROUP BY 1"
+            ).fetchall())
+            minimo, maximo = con.execute("SELECT min(FechaPublicacion), max(FechaPublicacion) FROM licitaciones").fetchone()
+        self.rango_fechas = (pd.Timestamp(minimo), pd.Timestamp(maximo))
+        # mismas estructuras que ConjuntoDatos: código de cada valor (en orden),
+        # opciones completas de Región y Estado y buscadores de Organismo y Categoría
+        self.codigos = {columna: {valor: i for i, valor in enumerate(sorted(valores))} for columna, valores in self.frecuencias.items()}
+        self.opciones = {columna: list(self.codigos[columna]) for columna in ("Region", "Estado")}
+        self.buscadores = {
+            columna: BuscadorOpciones(list(self.codigos[columna]), self._arreglo(columna, self.frecuencias[columna]))
+            for columna in ("Organismo", "Categoria")
+        }
+
+    def _arreglo(self, columna: str, conteos: dict) -> np.ndarray:
+        # conteos por valor -> arreglo por código
+        arreglo = np.zeros(len(self.codigos[columna]), dtype=np.int64)
+        for valor, conteo in conteos.items():
+            codigo = self.codigos[columna].get(valor)
+            if codigo is not None:
+                arreglo[codigo] = conteo
+        return arreglo
+
+    def _cursor(self):
+        # una conexión de lectura por proceso y un cursor por hilo
+        import duckdb
+
+        with self._conexion_lock:
+            if self._pid != os.getpid():
+                self._conexion_base = duckdb.connect(self.ruta, read_only=True, config=_configuracion())
+                self._pid = os.getpid()
+                self._local = threading.local()
+            if getattr(self._local, "cursor", None) is None:
+                self._local.cursor = self._conexion_base.cursor()
+            return self._local.cursor
+
+    def consultar(self, sql: str, parametros: list | None = None) -> pd.DataFrame:
+        return self._cursor().execute(sql, parametros or []).df()
+
+    def tabla_agregada(self, filtros: tuple) -> pd.DataFrame:
+        # medidas por día y tipo, con las columnas del cubo que usan los gráficos agregados
+        donde, parametros = condiciones(filtros)
+        data = self.consultar(f"""
+            SELECT date_trunc('day', FechaPublicacion) AS Dia,
+                   date_trunc('month', FechaPublicacion) AS MesPublicacion,
+                   Tipo,
+                   count(*) AS Licitaciones,
+                   coalesce(sum(MontoEstimado), 0) AS MontoEstimado,
+                   count(MontoEstimado) AS NMonto
+            FROM licitaciones WHERE {donde}
+            GROUP BY ALL ORDER BY Dia, Tipo
+        """, parametros)
+        return agregar_catalogos(data.astype({"Tipo": "category"}))
+
+    def conteo_regiones(self, estado_sel) -> pd.DataFrame:
+        # licitaciones por región (sin ventana de fechas), de mayor a menor
+        donde, parametros = _en("Estado", estado_sel) if estado_sel else ("TRUE", [])
+        data = self.consultar(f"""
+            SELECT Region, count(*) AS Licitaciones FROM licitaciones WHERE {donde}
+            GROUP BY Region ORDER BY Region NULLS LAST
+        """, parametros)
+        data = agregar_catalogos(data)[["Region", "RegionRoman", "Licitaciones"]]
+        data["RegionRoman"] = data["RegionRoman"].astype(object)
+        return data.sort_values("Licitaciones", ascending=False)
+
+    def montos_region(self) -> pd.DataFrame:
+        # monto por región del geojson, sin las regiones sin montos informados
+        data = self.consultar("""
+            SELECT Region, sum(MontoEstimado) AS MontoEstimado FROM licitaciones
+            WHERE MontoEstimado IS NOT NULL GROUP BY Region ORDER BY Region NULLS LAST
+        """)
+        return agregar_catalogos(data).groupby("RegionGeo", observed=True)["MontoEstimado"].sum().reset_index()
+
+    def puntos_scatter(self, filtros: tuple, maximo: int, bins: int = CELDAS_MUESTRA) -> tuple[pd.DataFrame, int]:
+        # muestra de a lo más ~maximo licitaciones con monto y duración, en el
+        # orden de las tablas en memoria, y el total de esas licitaciones. La
+        # muestra se calcula en la consulta como app.muestra_estratificada:
+        # grilla log-log, cuota por celda según su densidad (al menos un punto)
+        # y orden dentro de la celda por un hash de Fila
+        donde, parametros = condiciones(filtros)
+        maximo, bins = int(maximo), int(bins)
+        data = self.consultar(f"""
+            WITH validos AS (
+                SELECT Fila, unidad_format, MontoEstimado, CodigoExterno,
+                       log10(unidad_format) AS lx, log10(MontoEstimado) AS ly
+                FROM licitaciones
+                WHERE {donde} AND MontoEstimado > 0 AND unidad_format > 0
+            ), celdas AS (
+                SELECT *, count(*) OVER () AS Total,
+                       least(floor((lx - min(lx) OVER ()) / coalesce(nullif(max(lx) OVER () - min(lx) OVER (), 0), 1.0)
+                                   * {bins}), {bins} - 1) * {bins}
+                       + least(floor((ly - min(ly) OVER ()) / coalesce(nullif(max(ly) OVER () - min(ly) OVER (), 0), 1.0)
+                                     * {bins}), {bins} - 1) AS celda
+                FROM validos
+            ), ordenados AS (
+                SELECT *, count(*) OVER (PARTITION BY celda) AS en_celda,
+                       row_number() OVER (PARTITION BY celda ORDER BY (Fila * {HASH_MUESTRA}) % 4294967296) - 1 AS rango
+                FROM celdas
+            )
+            SELECT unidad_format, MontoEstimado, CodigoExterno, Total FROM ordenados
+            WHERE Total <= {maximo} OR rango < greatest(1, round_even(en_celda * {maximo} / Total, 0))
+            ORDER BY Fila
+        """, parametros)
+        return data.drop(columns="Total"), int(data["Total"].iloc[0]) if len(data) else 0
+
+    def conteos_opciones(self, columna: str, filtros: tuple) -> np.ndarray:
+        # licitaciones por código de la columna con los filtros dados
+        donde, parametros = condiciones(filtros)
+        if columna == "Categoria":
+            sql = f"""
+                SELECT Categoria, count(DISTINCT CodigoExterno) FROM items
+                WHERE Categoria IS NOT NULL
+                  AND CodigoExterno IN (SELECT CodigoExterno FROM licitaciones WHERE {donde})
+                GROUP BY 1
+            """
+        else:
+            sql = f"SELECT {columna}, count(*) FROM licitaciones WHERE {donde} AND {columna} IS NOT NULL GROUP BY 1"
+        return self._arreglo(columna, dict(self._cursor().execute(sql, parametros).fetchall()))
+
+    def ficha(self, codigo: str) -> dict | None:
+        # datos de una licitación para el panel de detalle
+        fila = self.consultar("""
+            SELECT NombreLicitacion, Organismo, MontoEstimado, unidad_format, Descripcion
+            FROM licitaciones WHERE CodigoExterno = ? LIMIT 1
+        """, [codigo])
+        if fila.empty:
+            return None
+        categorias = self.consultar(
+            "SELECT Categoria FROM items WHERE CodigoExterno = ? AND Categoria IS NOT NULL ORDER BY rowid", [codigo]
+        )["Categoria"]
+        return {**fila.iloc[0].to_dict(), "Categorias": list(dict.fromkeys(categorias))}
+
+
+class IngestaDuckDB(Ingesta):
+    # Ingesta con el almacén como conjunto vigente: mismos volcados, suscriptores
+    # y revisión periódica de la carpeta, pero cada combinación de volcados
+    # se construye completa en su propio almacén
+
+    def cargar(self) -> AlmacenDuckDB:
+        self.revisar()
+        return self.actual
+
+    def revisar(self) -> int:
+        # abre (o construye) el almacén de la fuente más los volcados de la
+        # carpeta; devuelve 1 si cambió el almacén vigente
+        with self._lock:
+            volcados = [(ruta, huella) for ruta, huella in self.volcados() if huella not in self._fallidos]
+            huellas = tuple(huella for _, huella in volcados)
+            version = huella_conjunto(self.huella_base, huellas)
+            if self.actual is not None and self.actual.version == version:
+                return 0
+            ruta = ruta_almacen(version)
+            if not os.path.exists(ruta):
+                inicio = time.perf_counter()
+                try:
+                    construir_almacen(expandir_fuentes(self.ruta_base) + [ruta for ruta, _ in volcados], ruta)
+                except Exception:
+                    if self.actual is None:
+                        raise
+                    # se sigue con el almacén vigente; los volcados nuevos se reintentan solo si cambian
+                    logger.exception("no se pudo construir el almacén %s", ruta)
+                    self._fallidos.update(set(huellas) - set(self.actual.volcados))
+                    return 0
+                logger.info("almacén %s construido (%.2f s)", ruta, time.perf_counter() - inicio)
+            self._publicar(AlmacenDuckDB(ruta, version, huellas))
+            return 1
+
+    def _publicar(self, almacen: AlmacenDuckDB) -> None:
+        self.actual = almacen
+        for funcion in self._suscriptores:
+            funcion(almacen)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    parser = argparse.ArgumentParser(description="Construye el almacén DuckDB de licitaciones.")
+    parser.add_argument("ruta", nargs="?", default=None, help="volcado .json/.zip, carpeta o patrón glob")
+    args = parser.parse_args()
+    almacen = IngestaDuckDB(ruta_base=args.ruta).cargar()
+    print(f"almacén {almacen.ruta}: {almacen.consultar('SELECT count(*) AS n FROM licitaciones')['n'].iloc[0]} licitaciones")
@@ -6,103 +6,42 @@ Created on Wed Apr  2 23:47:28 2025
 """
 # librerías
 from __future__ import annotations
-import json
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import dash
 from dash import dcc, html
 import dash_bootstrap_components as dbc
 from dash import Input, Output
-import datetime
+from flask import Response, has_request_context, request
+import importlib.util
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+from almacen import CELDAS_MUESTRA, HASH_MUESTRA, MOTOR_DATOS, AlmacenDuckDB, IngestaDuckDB
+from cache_figuras import CacheFiguras
+from catalogos import agregar_catalogos
+from compactar import FIGURAS_COMPACTAS, compactar_figura
+from geo_regiones import GEOJSON_BYTES, GEOJSON_ETAG
+from ingesta import ConjuntoDatos, Ingesta
+from metricas import metricas
+from texto import tokenizar
+
+logger = logging.getLogger(__name__)
 
 # cargar base de datos JSON detalles de licitaciones de mercado público
-with open('mercado_publico.detalles.json', 'r', encoding='utf-8') as file:
-    data_detalles = json.load(file)
-
-# %%
-
-# extraer información tabular desde la sección 'detalle'
-rows = []
-for entry in data_detalles:
-    detalle = entry.get("detalle", {})
-    fechas = detalle.get("Fechas", {})
-    items = detalle.get("Items", {}).get("Listado", [])
-    monto_estimado = detalle.get("MontoEstimado")
-    
-    # normalizar el campo de monto estimado
-    if isinstance(monto_estimado, dict):
-        monto_estimado = monto_estimado.get("$numberDouble")
-    
-    for item in items:
-        # si un item está contenido dentro de un dict, extraerlo
-        codigo_producto = item.get("CodigoProducto")
-        if isinstance(codigo_producto, dict):
-            codigo_producto = codigo_producto.get("$numberInt")
-        
-        unidad_duracion = detalle.get("UnidadTiempoDuracionContrato")
-        if isinstance(unidad_duracion, dict):
-            unidad_duracion = unidad_duracion.get("$numberInt")
-
-        cantidad_producto = item.get("Cantidad")
-        if isinstance(cantidad_producto, dict):
-            cantidad_producto = cantidad_producto.get("$numberDouble")
-        
-        codigo_tipo = detalle.get("CodigoTipo")
-        if isinstance(codigo_tipo, dict):
-            codigo_tipo = codigo_tipo.get("$numberInt")
-        
-        comuna_comprador = detalle.get("Comprador")
-        if isinstance(comuna_comprador, dict):
-            comuna_comprador = comuna_comprador.get("ComunaUnidad")
-            
-        nombre_unidad = detalle.get("Comprador")
-        if isinstance(nombre_unidad, dict):
-            nombre_unidad = nombre_unidad.get("NombreUnidad")
-        
-        # unir los valores a una lista de json
-        rows.append({
-            "CodigoExterno": detalle.get("CodigoExterno"),
-            "NombreLicitacion": detalle.get("Nombre"),
-            "Descripcion": detalle.get("Descripcion"),
-            "Region": detalle.get("Comprador", {}).get("RegionUnidad"),
-            "Organismo": detalle.get("Comprador", {}).get("NombreOrganismo"),
-            "Estado": detalle.get("Estado"),
-            "MontoEstimado": monto_estimado,
-            "FechaPublicacion": fechas.get("FechaPublicacion"),
-            "FechaCierre": fechas.get("FechaCierre"),
-            "CodigoProducto": codigo_producto,
-            "NombreProducto": item.get("NombreProducto"),
-            "CantidadProducto": cantidad_producto,
-            "Categoria": item.get("Categoria"),
-            "TiempoDuracionContrato": detalle.get("TiempoDuracionContrato"),
-            "UnidadTiempoDuracionContrato": unidad_duracion,
-            "CodigoTipo": codigo_tipo,
-            "Tipo": detalle.get("Tipo"),
-            "ComunaComprador": comuna_comprador,
-            "NombreUnidad": nombre_unidad
-
-        })
-# crear un dataframe con la información contenida en el json
-df = pd.DataFrame(rows)
-
-# normalización de campos
-df["ComunaComprador"] = df["ComunaComprador"].apply(lambda x: "No indica" if not x else x)
-df["FechaPublicacion"] = pd.to_datetime(df["FechaPublicacion"], errors="coerce")
-df["FechaCierre"] = pd.to_datetime(df["FechaCierre"], errors="coerce")
-df["MontoEstimado"] = pd.to_numeric(df["MontoEstimado"], errors="coerce")
-df["CantidadProducto"] = pd.to_numeric(df["CantidadProducto"], errors="coerce")
-df['UnidadTiempoDuracionContrato'] = df['UnidadTiempoDuracionContrato'].astype(int)
-df['TiempoDuracionContrato'] = df['TiempoDuracionContrato'].astype(int)
-df["Region"] = df["Region"].str.strip()
-df["Organismo"] = df["Organismo"].str.strip()
-df['unidad_format'] = df.apply(lambda x: x['TiempoDuracionContrato']/24 if x['UnidadTiempoDuracionContrato'] == 1 else x['TiempoDuracionContrato'],axis=1)
-df['unidad_format'] = df.apply(lambda x: x['TiempoDuracionContrato']*7 if x['UnidadTiempoDuracionContrato'] == 3 else x['unidad_format'],axis=1)
-df['unidad_format'] = df.apply(lambda x: x['TiempoDuracionContrato']*30 if x['UnidadTiempoDuracionContrato'] == 4 else x['unidad_format'],axis=1)
-df['unidad_format'] = df.apply(lambda x: x['TiempoDuracionContrato']*365 if x['UnidadTiempoDuracionContrato'] == 5 else x['unidad_format'],axis=1)
-# fecha a nivel mes para series temporales
-df["MesPublicacion"] = df["FechaPublicacion"].dt.to_period("M").dt.to_timestamp()
-# considerar licitaciones del año 2024-2025
-df = df.loc[df['FechaPublicacion']>=datetime.datetime(2024,1,1)]
+# (lectura incremental del JSON, directo desde json_detalles_MP.zip si no está extraído)
+# en dos tablas: licitaciones (una fila por licitación) e items, unidas por CodigoExterno,
+# más los volcados nuevos de la carpeta de ingesta. Cada request usa el conjunto
+# vigente (ingesta.actual: tablas, índices invertidos y cubo pre-agregado), que se
+# reemplaza completo al ingerir un volcado nuevo. Con MOTOR_DATOS=duckdb el
+# conjunto vigente es un almacén DuckDB en disco y los gráficos se calculan con
+# consultas SQL sobre él, sin cargar las tablas en memoria (ver almacen.py)
+ingesta = IngestaDuckDB.desde_entorno() if MOTOR_DATOS == "duckdb" else Ingesta.desde_entorno()
+ingesta.cargar()
 # %%
 
 
@@ -117,23 +56,44 @@ agregar nuevos filtros o gráficos sin romper la estructura.
 
 # inicialización de la app
 
+# respuestas comprimidas con gzip si está instalado flask-compress (dash[compress]);
+# COMPRIMIR=0 las desactiva (por ejemplo, si ya comprime un proxy)
+COMPRIMIR = os.environ.get("COMPRIMIR", "1") == "1" and importlib.util.find_spec("flask_compress") is not None
+
 app = dash.Dash(
     __name__,
     title="Panel Licitaciones Mercado Público",
     external_stylesheets=[dbc.themes.SANDSTONE],
-
+    compress=COMPRIMIR,
 )
 
+# geojson de regiones servido como archivo estático: el navegador lo descarga
+# una sola vez y los callbacks del mapa solo envían los montos por región
+RUTA_GEOJSON = "/geo/regiones.json"
+
+
+@app.server.route(RUTA_GEOJSON)
+def servir_geojson() -> Response:
+    if request.if_none_match.contains(GEOJSON_ETAG):
+        return Response(status=304)
+    respuesta = Response(GEOJSON_BYTES, mimetype="application/geo+json")
+    respuesta.set_etag(GEOJSON_ETAG)
+    respuesta.headers["Cache-Control"] = "public, max-age=86400"
+    return respuesta
+
+
 # Layout
 
 def serve_layout() -> html.Div:
-    # obtener valores para filtros
-    regions = sorted(df["Region"].dropna().unique())
-    estados = sorted(df["Estado"].dropna().unique())
-    organismos = sorted(df["Organismo"].dropna().unique())
-    categorias = sorted(df["Categoria"].dropna().unique())
-    min_date = df["FechaPublicacion"].min().date()
-    max_date = df["FechaPublicacion"].max().date()
+    # el layout se arma en cada carga de página, con los datos vigentes
+    datos = ingesta.actual
+    # valores para filtros, calculados al cargar los datos; Organismo y Categoría
+    # parten sin opciones y se completan con la búsqueda en el servidor
+    regions = datos.opciones["Region"]
+    estados = datos.opciones["Estado"]
+    min_date, max_date = rango_fechas(datos)
+    # el mapa no depende de los filtros: una figura por versión de los datos
+    mapa = responder("world-map", ("world-map", datos.version), lambda: datos, figura_mapa)
 
     # sidebar con filtros
     sidebar = dbc.Col(
@@ -173,9 +133,9 @@ def serve_layout() -> html.Div:
             html.Label("Organismo"),
             dcc.Dropdown(
                 id="org-dd",
-                options=[{"label": o, "value": o} for o in organismos],
+                options=[],
                 value=[],
-                placeholder="Filtrar por Organismo",
+                placeholder="Buscar Organismo",
                 multi=True,
                 className="mb-3",
                 style={"color": "black"}
@@ -184,13 +144,23 @@ def serve_layout() -> html.Div:
             html.Label("Categoría"),
             dcc.Dropdown(
                 id="cat-dd",
-                options=[{"label": o, "value": o} for o in categorias],
+                options=[],
                 value=[],
-                placeholder="Filtrar por Categoría",
+                placeholder="Buscar Categoría",
                 multi=True,
                 className="mb-3",
                 style={"color": "black"}
             ),
+            # filtro de palabras clave (nombre, descripción y productos de la licitación)
+            html.Label("Palabras clave"),
+            dcc.Input(
+                id="palabras-in",
+                type="text",
+                value="",
+                debounce=True,
+                placeholder="Buscar en nombre, descripción y productos",
+                className="form-control mb-3",
+            ),
             # filtro de rango de fechas
             html.Div([
             html.Label("Rango de fechas", style={"display": "block"}),
@@ -292,7 +262,18 @@ def serve_layout() -> html.Div:
                                 # header de la carta
                                 dbc.CardHeader("Duración del Contrato vs Monto Estimado"),
                                 # gráfico
-                                dbc.CardBody(dcc.Graph(id="scatter-plot", style={"height": "593px"})),
+                                dbc.CardBody(
+                                    [
+                                        dcc.Graph(id="scatter-plot", style={"height": "520px"}),
+                                        # detalle de la licitación, se carga al hacer clic en un punto
+                                        html.Div(
+                                            "Haga clic en un punto para ver el detalle de la licitación.",
+                                            id="scatter-detalle",
+                                            className="mt-2",
+                                            style={"fontSize": "0.9rem", "minHeight": "60px"},
+                                        ),
+                                    ]
+                                ),
                             ],
                             className="shadow-sm rounded",
                         ),
@@ -333,7 +314,7 @@ def serve_layout() -> html.Div:
                                 # header de la carta
                                 dbc.CardHeader("Mapa de Monto Estimado por Región"),
                                 # gráfico
-                                dbc.CardBody(dcc.Graph(id="world-map", style={"height": "1000px"})),
+                                dbc.CardBody(dcc.Graph(id="world-map", figure=mapa, style={"height": "1000px"})),
                             ],
                         ),
                         md=4,
@@ -354,140 +335,206 @@ def serve_layout() -> html.Div:
     )
 
 
-# aplicar layout
-app.layout = serve_layout
+# subconjunto filtrado compartido entre callbacks
+
+# cada gráfico tiene su propio callback; los que usan los mismos filtros
+# comparten la máscara booleana, calculada una vez por combinación de filtros.
+# Los gráficos agregados filtran el cubo (o las licitaciones, si hay filtro de
+# categoría); el scatter, que necesita cada punto, filtra las licitaciones
+# compartidas sin copiarlas
+_filtro_lock = threading.Lock()
+
+# ventana de fechas de publicación que muestra el panel: desde (incluida) y
+# hasta (excluida, opcional), en formato AAAA-MM-DD
+FECHA_PANEL_DESDE = pd.Timestamp(os.environ.get("FECHA_PANEL_DESDE", "2025-01-01"))
+FECHA_PANEL_HASTA = pd.Timestamp(os.environ["FECHA_PANEL_HASTA"]) if os.environ.get("FECHA_PANEL_HASTA") else None
+
+
+def clave_filtros(region_sel, estado_sel, org_sel, cat_sel, start_date, end_date, palabras=None) -> tuple:
+    # tupla normalizada (el orden de selección en los dropdowns no importa; las
+    # palabras clave quedan plegadas, sin palabras vacías)
+    return (
+        tuple(sorted(region_sel or [])),
+        tuple(sorted(estado_sel or [])),
+        tuple(sorted(org_sel or [])),
+        tuple(sorted(cat_sel or [])),
+        start_date,
+        end_date,
+        " ".join(tokenizar(palabras)) or None,
+    )
 
-# callbacks, definir inputs (filtros) y outputs (gráficos)
 
-@app.callback(
-    Output("bar-region", "figure"),
-    Output("line-monto", "figure"),
-    Output("line-time", "figure"),
-    Output("scatter-plot", "figure"),
-    Output("pie-chart", "figure"),
-    Output("world-map", "figure"),
-    Input("region-dd", "value"),
-    Input("estado-dd", "value"),
-    Input("org-dd", "value"),
-    Input("cat-dd", "value"),
-    Input("date-range", "start_date"),
-    Input("date-range", "end_date"),
-    Input("tipo-toggle", "value"),
-)
+def limites_fechas(start_date, end_date) -> tuple:
+    # ventana del panel y rango elegido: desde (incluida) y hasta (excluida, o None)
+    desde, hasta = FECHA_PANEL_DESDE, FECHA_PANEL_HASTA
+    if start_date and end_date:
+        # rango por día completo: la fecha de término incluye todo ese día
+        desde = max(desde, pd.Timestamp(start_date).normalize())
+        fin = pd.Timestamp(end_date).normalize() + pd.Timedelta(days=1)
+        hasta = fin if hasta is None else min(hasta, fin)
+    return desde, hasta
+
+
+def filtros_almacen(filtros: tuple) -> tuple:
+    # filtros normalizados con las fechas como límites, para las consultas del almacén
+    clave = clave_filtros(*filtros)
+    return clave[:4] + limites_fechas(clave[4], clave[5]) + clave[6:]
+
+
+def tramo_fechas(fechas: pd.Series, start_date, end_date) -> slice:
+    # filas de la ventana del panel y del rango elegido; las tablas están
+    # ordenadas por fecha (sin fechas nulas), así el tramo se ubica con búsqueda binaria
+    desde, hasta = limites_fechas(start_date, end_date)
+    inicio = int(fechas.searchsorted(desde, side="left"))
+    termino = len(fechas) if hasta is None else int(fechas.searchsorted(hasta, side="left"))
+    return slice(inicio, max(inicio, termino))
 
-def update_graphs(region_sel, estado_sel, org_sel, cat_sel, start_date, end_date, tipo_toggle):
-    # cargar el geojson de regiones
-    with open("regiones.json", "r", encoding="utf-8") as f:
-        chile_geojson = json.load(f)
-    import datetime
-    
-    # diccionarios con mapeos para gráficos particulares (Tipo y región)
-    tipo_map = {
-    "L1": "LP <100 UTM",
-    "LE": "LP 100‑1k",
-    "LP": "LP 1k‑2k",
-    "LQ": "LP 2k‑5k",
-    "LR": "LP >5k",
-    "E2": "LPriv <100",
-    "CO": "LPriv 100‑1k",
-    "B2": "LPriv 1k‑2k",
-    "H2": "LPriv 2k‑5k",
-    "I2": "LPriv >5k",
-    "LS": "LP Serv. pers.",
-    }
-    mapeo_regiones = {
-        "Región de la Araucanía": "Región de La Araucanía",
-        "Región Metropolitana de Santiago": "Región Metropolitana de Santiago",
-        "Región de Coquimbo": "Región de Coquimbo",
-        "Región del Maule": "Región del Maule",
-        "Región Aysén del General Carlos Ibáñez del Campo": "Región de Aysén del Gral.Ibañez del Campo",
-        "Región de Tarapacá": "Región de Tarapacá",
-        "Región de Atacama": "Región de Atacama",
-        "Región de Valparaíso": "Región de Valparaíso",
-        "Región de Magallanes y de la Antártica": "Región de Magallanes y Antártica Chilena",
-        "Región del Biobío": "Región del Bío-Bío",
-        "Región del Libertador General Bernardo O´Higgins": "Región del Libertador Bernardo O'Higgins",
-        "Región de Los Ríos": "Región de Los Ríos",
-        "Región del Ñuble": "Región de Ñuble",
-        "Región de los Lagos": "Región de Los Lagos",
-        "Región de Antofagasta": "Región de Antofagasta",
-        "Región de Arica y Parinacota": "Región de Arica y Parinacota"
-    }
-    region_roman = {
-    "Región de Arica y Parinacota": "XV",
-    "Región de Tarapacá": "I",
-    "Región de Antofagasta": "II",
-    "Región de Atacama": "III",
-    "Región de Coquimbo": "IV",
-    "Región de Valparaíso": "V",
-    "Región Metropolitana de Santiago": "RM",
-    "Región del Libertador General Bernardo O´Higgins": "VI",
-    "Región del Maule": "VII",
-    "Región de Ñuble": "XVI",
-    "Región del Biobío": "VIII",
-    "Región de la Araucanía": "IX",
-    "Región de Los Ríos": "XIV",
-    "Región de los Lagos": "X",
-    "Región de Aysén del General Carlos Ibáñez del Campo": "XI",
-    "Región de Magallanes y de la Antártica": "XII",
-    }
-    
-    # filtra el dataframe según los controles y devuelve las figuras
-    data_region = df.copy()
-    data = df.copy()
-    data_map = data.copy()
-    data = data.loc[data['FechaPublicacion']>= datetime.datetime(2025,1,1)]
 
-    # condicionales si es que se selecciona algún filtro
+def _mascara_filtros(fechas: pd.Series, indices_tabla: dict, clave: tuple) -> np.ndarray:
+    region_sel, estado_sel, org_sel, cat_sel, start_date, end_date, palabras = clave
+    mascara = np.zeros(len(fechas), dtype=bool)
+    mascara[tramo_fechas(fechas, start_date, end_date)] = True
+
+    # condicionales si es que se selecciona algún filtro: unión de las filas de
+    # cada valor (índice invertido) e intersección entre filtros
     if region_sel:
-        data = data.loc[data["Region"].isin(region_sel)]
+        mascara &= indices_tabla["Region"].mascara(region_sel)
     if estado_sel:
-        data = data[data["Estado"].isin(estado_sel)]
-        data_region = data_region[data_region["Estado"].isin(estado_sel)]
+        mascara &= indices_tabla["Estado"].mascara(estado_sel)
     if org_sel:
-        data = data[data["Organismo"].isin(org_sel)]
+        mascara &= indices_tabla["Organismo"].mascara(org_sel)
     if cat_sel:
-        data = data[data["Categoria"].isin(cat_sel)]
-    if start_date and end_date:
-        data = data[(data["FechaPublicacion"] >= start_date) & (data["FechaPublicacion"] <= end_date)]
+        mascara &= indices_tabla["Categoria"].mascara(cat_sel)
+    if palabras:
+        mascara &= indices_tabla["texto"].mascara(palabras)
+    # la máscara queda compartida en la caché: no se puede modificar
+    mascara.flags.writeable = False
+    return mascara
+
+
+# las máscaras se guardan por (conjunto de datos, filtros); al ingerir un
+# volcado nuevo se vacían para liberar las del conjunto anterior
+@lru_cache(maxsize=64)
+def _mascara(datos: ConjuntoDatos, clave: tuple) -> np.ndarray:
+    indices = {**datos.indices, "texto": datos.texto()} if clave[6] else datos.indices
+    return _mascara_filtros(datos.licitaciones["FechaPublicacion"], indices, clave)
+
+
+@lru_cache(maxsize=64)
+def _mascara_cubo(datos: ConjuntoDatos, clave: tuple) -> np.ndarray:
+    return _mascara_filtros(datos.cubo["Dia"], datos.indices_cubo, clave)
+
+
+@ingesta.al_actualizar
+def _limpiar_mascaras(datos: ConjuntoDatos) -> None:
+    with _filtro_lock:
+        _mascara.cache_clear()
+        _mascara_cubo.cache_clear()
+
+
+def filtrar(datos, region_sel, estado_sel, org_sel, cat_sel, start_date, end_date, palabras=None) -> np.ndarray:
+    # máscara sobre las filas de licitaciones
+    # el lock evita que los callbacks disparados en paralelo filtren lo mismo varias veces
+    clave = clave_filtros(region_sel, estado_sel, org_sel, cat_sel, start_date, end_date, palabras)
+    with _filtro_lock:
+        return _mascara(datos, clave)
+
+
+def filtrar_cubo(datos, region_sel, estado_sel, org_sel, cat_sel, start_date, end_date, palabras=None) -> np.ndarray:
+    # máscara sobre las filas del cubo
+    # las palabras clave no son dimensión del cubo (ver tabla_agregada)
+    clave = clave_filtros(region_sel, estado_sel, org_sel, cat_sel, start_date, end_date)
+    with _filtro_lock:
+        return _mascara_cubo(datos, clave)
+
+
+def tabla_agregada(datos, region_sel, estado_sel, org_sel, cat_sel, start_date, end_date, palabras=None) -> pd.DataFrame:
+    # filas con las medidas Licitaciones, MontoEstimado y NMonto para los gráficos agregados
+    if isinstance(datos, AlmacenDuckDB):
+        # agrupadas por día y tipo en la consulta SQL
+        filtros = (region_sel, estado_sel, org_sel, cat_sel, start_date, end_date, palabras)
+        return datos.tabla_agregada(filtros_almacen(filtros))
+    if cat_sel or tokenizar(palabras):
+        # Categoria y las palabras clave no son dimensiones del cubo: agregar las
+        # licitaciones seleccionadas por sus índices (cada licitación cuenta una vez)
+        mascara = filtrar(datos, region_sel, estado_sel, org_sel, cat_sel, start_date, end_date, palabras)
+        data = datos.licitaciones.loc[mascara, ["Tipo", "FechaPublicacion", "MontoEstimado"]]
+        return agregar_catalogos(data).assign(
+            Dia=data["FechaPublicacion"].dt.normalize(),
+            MesPublicacion=data["FechaPublicacion"].dt.to_period("M").dt.to_timestamp(),
+            Licitaciones=1,
+            NMonto=data["MontoEstimado"].notna().astype(int),
+        )
+    return datos.cubo.loc[filtrar_cubo(datos, region_sel, estado_sel, org_sel, cat_sel, start_date, end_date)]
+
 
-    # Gráfico 1: Nº licitaciones por región
-    # agrupar data por región
+def rango_fechas(datos) -> tuple:
+    # primera y última fecha de publicación del conjunto
+    if isinstance(datos, AlmacenDuckDB):
+        desde, hasta = datos.rango_fechas
+    else:
+        fechas = datos.licitaciones["FechaPublicacion"]
+        desde, hasta = fechas.min(), fechas.max()
+    return desde.date(), hasta.date()
+
+
+def conteo_regiones(datos, estado_sel) -> pd.DataFrame:
+    # licitaciones por región, con su número romano, de mayor a menor
+    if isinstance(datos, AlmacenDuckDB):
+        return datos.conteo_regiones(estado_sel)
+    cubo = datos.cubo
+    data_region = cubo[["Region", "RegionRoman", "Licitaciones"]]
+    if estado_sel:
+        data_region = data_region[datos.indices_cubo["Estado"].mascara(estado_sel)]
+
+    # agrupar data por región (el número romano viene del cubo)
     region_counts = (
-        data_region.groupby("Region", dropna=False)
-        .size()
-        .reset_index(name="Licitaciones")
+        data_region.groupby(["Region", "RegionRoman"], dropna=False, observed=True)["Licitaciones"]
+        .sum()
+        .reset_index()
         .sort_values("Licitaciones", ascending=False)
     )
-    # mapear n de región
-    region_counts["RegionRoman"] = region_counts["Region"].map(region_roman)
-    # mostrar el nombre al hover del mouse
-    region_counts["CustomHover"] = (
-        "Región=" + region_counts["Region"] + "<br>Nº licitaciones=" + region_counts["Licitaciones"].astype(str)
-    )
+    # Region es categórica: volver a texto para el hover
+    region_counts["Region"] = region_counts["Region"].astype(cubo["Region"].cat.categories.dtype)
+    region_counts["RegionRoman"] = region_counts["RegionRoman"].astype(object)
+    return region_counts
+
+
+# figuras
+
+def figura_region(datos, estado_sel):
+    # Gráfico 1: Nº licitaciones por región (solo depende del filtro de estado)
+    region_counts = conteo_regiones(datos, estado_sel)
     # graficar
     fig_region = px.bar(
         region_counts,
         x="RegionRoman",
         y="Licitaciones",
         labels={"RegionRoman": "Región", "Licitaciones": "Nº licitaciones"},
-        custom_data=["CustomHover"]
+        custom_data=["Region"]
     )
+    # mostrar el nombre al hover del mouse; el texto se arma en el navegador
+    # con el nombre y el conteo de cada barra, sin repetirlo en la figura
     fig_region.update_traces(
-        hovertemplate="%{customdata[0]}"
+        hovertemplate="Región=%{customdata[0]}<br>Nº licitaciones=%{y:d}"
     )
     fig_region.update_layout(
         xaxis_title="",
         yaxis_title=""
     )
+    return fig_region
+
 
+def figura_monto(data):
     # Gráfico 2: Monto total por mes
     monto_mensual = (
-    data.dropna(subset=["MontoEstimado"])
-    .groupby("MesPublicacion")["MontoEstimado"]
+    data[["MesPublicacion", "MontoEstimado", "NMonto"]]
+    .groupby("MesPublicacion")
     .sum()
     .reset_index()
     )
+    # meses sin ningún monto informado no aparecen en el gráfico
+    monto_mensual = monto_mensual.loc[monto_mensual["NMonto"] > 0, ["MesPublicacion", "MontoEstimado"]]
     
     # agrega columna con nombre de mes
     monto_mensual["MesTexto"] = monto_mensual["MesPublicacion"].dt.strftime("%B %Y")
@@ -500,10 +547,14 @@ def update_graphs(region_sel, estado_sel, org_sel, cat_sel, start_date, end_date
     labels={"MesTexto": "Mes", "MontoEstimado": "Monto (CLP)"},
     )
     fig_monto.update_yaxes(tickprefix="$", separatethousands=True)
-    
+    return fig_monto
+
+
+def figura_licitaciones(data):
     # Gráfico 3: Cantidad de licitaciones por día
     # agrupar por día
-    licitaciones_por_dia = data.groupby(data['FechaPublicacion'].dt.date).size().reset_index(name='Cantidad')
+    por_dia = data.groupby("Dia")["Licitaciones"].sum()
+    licitaciones_por_dia = pd.DataFrame({'FechaPublicacion': por_dia.index.date, 'Cantidad': por_dia.to_numpy()})
 
     # graficar
     fig_licitaciones = px.line(licitaciones_por_dia, x='FechaPublicacion', y='Cantidad',
@@ -513,42 +564,129 @@ def update_graphs(region_sel, estado_sel, org_sel, cat_sel, start_date, end_date
                       yaxis_title='Cantidad de licitaciones',
                       xaxis=dict(tickangle=45),
                       template='plotly_white')
-    
+    return fig_licitaciones
+
+
+# sobre este número de puntos el scatter se muestrea en el servidor
+SCATTER_MAX_PUNTOS = int(os.environ.get("SCATTER_MAX_PUNTOS", 5000))
+# sobre este número de puntos el scatter se dibuja con WebGL
+SCATTER_WEBGL_DESDE = int(os.environ.get("SCATTER_WEBGL_DESDE", 1000))
+
+
+def muestra_estratificada(x: np.ndarray, y: np.ndarray, filas: np.ndarray, maximo: int,
+                          bins: int = CELDAS_MUESTRA) -> np.ndarray:
+    # posiciones de una muestra de a lo más ~maximo puntos, estratificada en una
+    # grilla log-log: cada celda aporta en proporción a su densidad y al menos
+    # un punto, así no se pierden los valores extremos.
+    # Misma muestra que AlmacenDuckDB.puntos_scatter: dentro de cada celda los
+    # puntos se toman en el orden de un hash fijo de su fila (Fila del almacén)
+    n = len(x)
+    if n <= maximo:
+        return np.arange(n)
+    celdas = []
+    for v in (np.log10(x), np.log10(y)):
+        rango = np.ptp(v) or 1.0
+        celdas.append(np.minimum(((v - v.min()) / rango * bins).astype(int), bins - 1))
+    celda = celdas[0] * bins + celdas[1]
+    clave = (filas.astype(np.uint64) * np.uint64(HASH_MUESTRA)) % np.uint64(2 ** 32)
+    agrupado = np.lexsort((clave, celda))
+    celda_agrupada = celda[agrupado]
+    # posición de cada punto dentro de su celda
+    rango_en_celda = np.arange(n) - np.searchsorted(celda_agrupada, celda_agrupada)
+    cuota = np.maximum(1, np.round(np.bincount(celda, minlength=bins * bins) * maximo / n)).astype(int)
+    return np.sort(agrupado[rango_en_celda < cuota[celda_agrupada]])
+
+
+def puntos_scatter(datos, region_sel, estado_sel, org_sel, cat_sel, start_date, end_date,
+                   palabras=None) -> tuple[pd.DataFrame, int]:
+    # muestra de las licitaciones filtradas con monto y duración positivos, y
+    # el total de esas licitaciones.
+    # un punto por licitación (monto y duración son datos de la licitación, no del item)
+    filtros = (region_sel, estado_sel, org_sel, cat_sel, start_date, end_date, palabras)
+    if isinstance(datos, AlmacenDuckDB):
+        # el muestreo se hace en la consulta: solo la muestra sale de DuckDB
+        return datos.puntos_scatter(filtros_almacen(filtros), SCATTER_MAX_PUNTOS)
+    licitaciones = datos.licitaciones
+    validos = filtrar(datos, *filtros) & (licitaciones['MontoEstimado'] > 0).to_numpy() & (licitaciones['unidad_format'] > 0).to_numpy()
+    df_validos = licitaciones.loc[validos, ['unidad_format', 'MontoEstimado', 'CodigoExterno']]
+    muestra = muestra_estratificada(
+        df_validos['unidad_format'].to_numpy(), df_validos['MontoEstimado'].to_numpy(),
+        np.flatnonzero(validos), SCATTER_MAX_PUNTOS,
+    )
+    return df_validos.iloc[muestra], len(df_validos)
+
+
+def figura_scatter(puntos):
     # Gráfico 4: Relación Monto estimado v/s duración del contrato
-    df_validos = data.copy()
-    df_validos = data[(data['MontoEstimado'] > 0) & (data['unidad_format'] > 0)]
+    df_validos, total = puntos
+    titulo = 'Scatterplot'
+    if len(df_validos) < total:
+        titulo += f' (muestra de {len(df_validos):,} de {total:,} licitaciones)'.replace(",", ".")
 
-    # crear el scatter plot
+    # crear el scatter plot; el detalle de cada punto se pide al hacer clic
+    # (CodigoExterno viaja como customdata en vez de los textos de hover)
     fig_scatter = px.scatter(
         df_validos,
         x='unidad_format',
         y='MontoEstimado',
-        hover_data=['NombreLicitacion', 'Organismo', 'Categoria'],
-        title='Scatterplot',
+        custom_data=['CodigoExterno'],
+        render_mode='webgl' if total > SCATTER_WEBGL_DESDE else 'svg',
+        title=titulo,
         labels={
             'unidad_format': 'Duración del contrato (días)',
             'MontoEstimado': 'Monto Estimado (CLP)'
         }
     )
     fig_scatter.update_layout(template='plotly_white')
-    
-    
+    return fig_scatter
+
+
+def ficha_licitacion(datos, codigo: str) -> dict | None:
+    # campos de una licitación y sus categorías, o None si no existe
+    if isinstance(datos, AlmacenDuckDB):
+        return datos.ficha(codigo)
+    try:
+        posicion = datos.indice_codigo.get_loc(codigo)
+    except KeyError:
+        return None
+    fila = datos.licitaciones.iloc[posicion]
+    return {
+        **fila[["NombreLicitacion", "Organismo", "MontoEstimado", "unidad_format"]].to_dict(),
+        # la descripción no está en la tabla en memoria: se lee de la caché al pedirla
+        "Descripcion": datos.diferidas()["Descripcion"].iloc[posicion],
+        "Categorias": list(datos.items["Categoria"].iloc[datos.items_por_licitacion.filas(codigo)].dropna().unique()),
+    }
+
+
+def detalle_licitacion(datos, codigo: str) -> list:
+    # ficha de una licitación para el panel bajo el scatter
+    fila = ficha_licitacion(datos, codigo)
+    if fila is None:
+        return [f"No se encontró la licitación {codigo}."]
+    descripcion = fila["Descripcion"]
+    return [
+        html.Strong(fila["NombreLicitacion"]),
+        html.Br(),
+        f"Código: {codigo} · Organismo: {fila['Organismo']}",
+        html.Br(),
+        f"Monto estimado: ${fila['MontoEstimado']:,.0f} · Duración: {fila['unidad_format']:,.0f} días".replace(",", "."),
+        html.Br(),
+        "Categorías: " + "; ".join(fila["Categorias"]),
+        html.Br(),
+        html.Small(descripcion[:400] + ("…" if len(descripcion) > 400 else "")) if isinstance(descripcion, str) else "",
+    ]
+
+
+def figura_pie(data, tipo_toggle):
     # Gráfico 5: Distribución de tipo de licitaciones
-    
-    data_pie = data.copy()
+    # conteo por grupo y por descripción del tipo (columnas del cubo, ver catalogos.py)
     # añadir condicionales de toggle
     # graficar toggle por grupo
     if tipo_toggle == "grupo":
-        def clasificar_tipo(codigo):
-            if codigo in ["L1", "LE", "LP", "LQ", "LR", "LS"]:
-                return "Público"
-            elif codigo in ["E2", "CO", "B2", "H2", "I2"]:
-                return "Privado"
-            else:
-                return "Otro"
-    
-        data_pie["Grupo"] = data_pie["Tipo"].apply(clasificar_tipo)
-        conteo_grupo = data_pie["Grupo"].value_counts().reset_index()
+        conteo_grupo = (
+            data.groupby("GrupoTipo", observed=True)["Licitaciones"].sum()
+            .sort_values(ascending=False, kind="stable").reset_index()
+        )
         conteo_grupo.columns = ["Grupo", "Cantidad"]
         fig_pie = px.pie(
             conteo_grupo,
@@ -559,10 +697,11 @@ def update_graphs(region_sel, estado_sel, org_sel, cat_sel, start_date, end_date
         )
     # graficar toggle por tipo de licitación privada
     elif tipo_toggle == "privado":
-        privados = ["E2", "CO", "B2", "H2", "I2"]
-        data_pie = data_pie[data_pie["Tipo"].isin(privados)]
-        data_pie["Tipo_desc"] = data_pie["Tipo"].map(tipo_map).fillna("Otro")
-        conteo_tipos = data_pie["Tipo_desc"].value_counts().reset_index()
+        data_sel = data.loc[data["GrupoTipo"] == "Privado", ["TipoDesc", "Licitaciones"]]
+        conteo_tipos = (
+            data_sel.groupby("TipoDesc", observed=True)["Licitaciones"].sum()
+            .sort_values(ascending=False, kind="stable").reset_index()
+        )
         conteo_tipos.columns = ["Tipo_desc", "Cantidad"]
     
         fig_pie = px.pie(
@@ -574,10 +713,11 @@ def update_graphs(region_sel, estado_sel, org_sel, cat_sel, start_date, end_date
         )
     # graficar toggle por tipo de licitación pública
     elif tipo_toggle == "publico":
-        publicos = ["L1", "LE", "LP", "LQ", "LR", "LS"]
-        data_pie = data_pie[data_pie["Tipo"].isin(publicos)]
-        data_pie["Tipo_desc"] = data_pie["Tipo"].map(tipo_map).fillna("Otro")
-        conteo_tipos = data_pie["Tipo_desc"].value_counts().reset_index()
+        data_sel = data.loc[data["GrupoTipo"] == "Público", ["TipoDesc", "Licitaciones"]]
+        conteo_tipos = (
+            data_sel.groupby("TipoDesc", observed=True)["Licitaciones"].sum()
+            .sort_values(ascending=False, kind="stable").reset_index()
+        )
         conteo_tipos.columns = ["Tipo_desc", "Cantidad"]
     
         fig_pie = px.pie(
@@ -588,30 +728,29 @@ def update_graphs(region_sel, estado_sel, org_sel, cat_sel, start_date, end_date
             hole=0.4
         )
     fig_pie.update_layout(template='plotly_white')
-
-    # Gráfico 6: Mapa de monto estimado por región en Chile
-    # limpieza
-    data_map["Region"] = data_map["Region"].str.strip()
-    data_map["Organismo"] = data_map["Organismo"].str.strip()
-    data_map = data_map.dropna(subset=['Region', 'MontoEstimado'])
-
-    # fecha a nivel mes para series temporales
-    data_map["MesPublicacion"] = data_map["FechaPublicacion"].dt.to_period("M").dt.to_timestamp()  
-    # mapear regiones con nombre en geojson
-    data_map["Region"] = data_map["Region"].map(mapeo_regiones).fillna(data_map["Region"])
+    return fig_pie
 
 
-    # agrupar datos por región y sumar monto
-    data_map_html = data_map.groupby("Region", as_index=False)["MontoEstimado"].sum()
-    
-    # normalizar
+def figura_mapa(datos):
+    # Gráfico 6: Mapa de monto estimado por región en Chile
+    # no depende de los filtros: se arma al servir el layout, con la geometría
+    # referenciada por URL y solo los montos por región en la figura
+    # monto por región desde el cubo (o el almacén), sin las regiones sin montos informados
+    if isinstance(datos, AlmacenDuckDB):
+        data_map_html = datos.montos_region()
+    else:
+        cubo = datos.cubo
+        # con el nombre de región del geojson (RegionGeo, ver catalogos.py)
+        data_map = cubo.loc[cubo["NMonto"] > 0, ["RegionGeo", "MontoEstimado"]]
+
+        # agrupar datos por región y sumar monto
+        data_map_html = data_map.groupby("RegionGeo", observed=True)["MontoEstimado"].sum().reset_index()
+    data_map_html.columns = ["Region", "MontoEstimado"]
     data_map_html["Region"] = data_map_html["Region"].astype(str)
-    data_map_html["Region"] = data_map_html["Region"].str.strip()
-    data_map_html["NOMBRE"] = data_map_html["Region"]  # copiar la columna con el nombre correcto
     # graficar
     fig_mapbox = px.choropleth_mapbox(
         data_map_html,
-        geojson=chile_geojson,
+        geojson=app.get_relative_path(RUTA_GEOJSON),
         locations="Region",              # debe coincidir con feature.properties.Region del geojson
         featureidkey="properties.Region",  # este es el campo dentro del geojson
         color="MontoEstimado",
@@ -627,11 +766,251 @@ def update_graphs(region_sel, estado_sel, org_sel, cat_sel, start_date, end_date
     fig_mapbox.update_layout(
         margin={"r":0,"t":30,"l":0,"b":0}
     )
-    # retornar gráficos para mostrar en dashboard
-    return fig_region, fig_monto, fig_licitaciones,fig_scatter,fig_pie,fig_mapbox
+    return fig_mapbox
+
+
+# caché LRU de figuras por (gráfico, versión de datos, filtros normalizados),
+# en memoria y opcionalmente en una carpeta compartida entre workers; la
+# versión cambia con cada volcado ingerido, así no se sirven figuras antiguas
+cache_figuras = CacheFiguras.desde_entorno()
+
+
+@app.server.route("/estado/cache-figuras")
+def estado_cache_figuras():
+    return cache_figuras.estadisticas()
+
+
+# tiempos por etapa en formato Prometheus (con METRICAS=1)
+@app.server.route("/metrics")
+def exponer_metricas() -> Response:
+    if not metricas.activas:
+        return Response("métricas desactivadas, definir METRICAS=1\n", status=404, mimetype="text/plain")
+    estadisticas = cache_figuras.estadisticas()
+    texto = metricas.exponer({
+        "dashboard_cache_figuras_aciertos_memoria_total": estadisticas["aciertos_memoria"],
+        "dashboard_cache_figuras_aciertos_disco_total": estadisticas["aciertos_disco"],
+        "dashboard_cache_figuras_fallos_total": estadisticas["fallos"],
+    })
+    return Response(texto, mimetype="text/plain; version=0.0.4")
+
+
+# bytes de cada respuesta de callback (sin comprimir), por salida, y del layout
+# (que trae el mapa), con METRICAS=1
+@app.server.after_request
+def medir_respuesta(respuesta: Response) -> Response:
+    if metricas.activas and request.path.endswith(("/_dash-update-component", "/_dash-layout")):
+        salida = (request.get_json(silent=True) or {}).get("output", "") if request.is_json else "layout"
+        metricas.observar("dashboard_respuesta_bytes", respuesta.calculate_content_length() or 0, salida=salida)
+    return respuesta
+
+
+def responder(grafico: str, clave: tuple, seleccionar, graficar):
+    # figura desde la caché, o filtrada y graficada, midiendo cada etapa
+    def calcular():
+        with metricas.etapa("filtro", grafico=grafico):
+            data = seleccionar()
+        with metricas.etapa("figura", grafico=grafico):
+            figura = graficar(data)
+            # arreglos tipados, valores redondeados y plantilla reducida (ver compactar.py)
+            return compactar_figura(figura) if FIGURAS_COMPACTAS else figura
+
+    with metricas.etapa("callback", grafico=grafico):
+        return cache_figuras.obtener_o_calcular(clave, calcular)
+
+
+# aplicar layout
+app.layout = serve_layout
+
+# callbacks, definir inputs (filtros) y outputs (gráficos)
+# cada gráfico depende solo de los filtros que usa
+
+FILTROS = [
+    Input("region-dd", "value"),
+    Input("estado-dd", "value"),
+    Input("org-dd", "value"),
+    Input("cat-dd", "value"),
+    Input("date-range", "start_date"),
+    Input("date-range", "end_date"),
+    Input("palabras-in", "value"),
+]
+
+
+# opciones de los dropdowns según los demás filtros activos, con el número de
+# licitaciones de cada una: solo se ofrecen valores que devuelven datos. Organismo
+# y Categoría devuelven hasta MAX_OPCIONES coincidencias del texto buscado (o las
+# más frecuentes, sin texto); las opciones ya elegidas se mantienen siempre
+MAX_OPCIONES = int(os.environ.get("MAX_OPCIONES", 50))
+POSICION_FILTRO = {"Region": 0, "Estado": 1, "Organismo": 2, "Categoria": 3}
+
+
+def conteos_opciones(datos, columna: str, filtros: tuple) -> np.ndarray:
+    # licitaciones por código de la columna, con todos los filtros salvo el suyo
+    otros = list(filtros)
+    otros[POSICION_FILTRO[columna]] = None
+    if isinstance(datos, AlmacenDuckDB):
+        return datos.conteos_opciones(columna, filtros_almacen(otros))
+    return datos.indices[columna].conteos(filtrar(datos, *otros))
+
+
+def opciones_filtro(columna: str, filtros: tuple, busqueda: str | None = None) -> list[dict]:
+    datos = ingesta.actual
+    # código de cada valor, en el orden de los conteos
+    codigo = datos.codigos[columna] if isinstance(datos, AlmacenDuckDB) else datos.indices[columna].codigo
+    conteos = conteos_opciones(datos, columna, filtros)
+    if columna in datos.buscadores:
+        valores = datos.buscadores[columna].buscar(busqueda, MAX_OPCIONES, conteos)
+    else:
+        valores = [valor for valor in datos.opciones[columna] if conteos[codigo[valor]]]
+    seleccion = filtros[POSICION_FILTRO[columna]] or []
+    elegidas = [valor for valor in seleccion if valor not in valores]
+    return [
+        {"label": f"{valor} ({conteos[codigo[valor]] if valor in codigo else 0})", "value": valor}
+        for valor in elegidas + valores
+    ]
+
+
+@app.callback(Output("region-dd", "options"), *FILTROS)
+def opciones_region(region_sel, estado_sel, org_sel, cat_sel, start_date, end_date, palabras):
+    return opciones_filtro("Region", (region_sel, estado_sel, org_sel, cat_sel, start_date, end_date, palabras))
+
+
+@app.callback(Output("estado-dd", "options"), *FILTROS)
+def opciones_estado(region_sel, estado_sel, org_sel, cat_sel, start_date, end_date, palabras):
+    return opciones_filtro("Estado", (region_sel, estado_sel, org_sel, cat_sel, start_date, end_date, palabras))
+
+
+@app.callback(Output("org-dd", "options"), *FILTROS, Input("org-dd", "search_value"))
+def opciones_organismo(region_sel, estado_sel, org_sel, cat_sel, start_date, end_date, palabras, busqueda):
+    return opciones_filtro("Organismo", (region_sel, estado_sel, org_sel, cat_sel, start_date, end_date, palabras), busqueda)
+
+
+@app.callback(Output("cat-dd", "options"), *FILTROS, Input("cat-dd", "search_value"))
+def opciones_categoria(region_sel, estado_sel, org_sel, cat_sel, start_date, end_date, palabras, busqueda):
+    return opciones_filtro("Categoria", (region_sel, estado_sel, org_sel, cat_sel, start_date, end_date, palabras), busqueda)
+
+
+@app.callback(Output("bar-region", "figure"), Input("estado-dd", "value"))
+def update_region(estado_sel):
+    datos = ingesta.actual
+    clave = ("bar-region", datos.version, tuple(sorted(estado_sel or [])))
+    # el filtro de estado se aplica sobre el cubo dentro de la figura
+    return responder("bar-region", clave, lambda: estado_sel, lambda sel: figura_region(datos, sel))
+
+
+@app.callback(Output("line-monto", "figure"), *FILTROS)
+def update_monto(region_sel, estado_sel, org_sel, cat_sel, start_date, end_date, palabras):
+    datos = ingesta.actual
+    filtros = (region_sel, estado_sel, org_sel, cat_sel, start_date, end_date, palabras)
+    clave = ("line-monto", datos.version, clave_filtros(*filtros))
+    return responder("line-monto", clave, lambda: tabla_agregada(datos, *filtros), figura_monto)
+
+
+@app.callback(Output("line-time", "figure"), *FILTROS)
+def update_licitaciones(region_sel, estado_sel, org_sel, cat_sel, start_date, end_date, palabras):
+    datos = ingesta.actual
+    filtros = (region_sel, estado_sel, org_sel, cat_sel, start_date, end_date, palabras)
+    # una vez por cambio de filtros (todos los gráficos reciben los mismos), solo
+    # en las peticiones del navegador y no en el precalentamiento
+    if has_request_context():
+        registrar_uso(filtros)
+    clave = ("line-time", datos.version, clave_filtros(*filtros))
+    return responder("line-time", clave, lambda: tabla_agregada(datos, *filtros), figura_licitaciones)
+
+
+@app.callback(Output("scatter-plot", "figure"), *FILTROS)
+def update_scatter(region_sel, estado_sel, org_sel, cat_sel, start_date, end_date, palabras):
+    datos = ingesta.actual
+    filtros = (region_sel, estado_sel, org_sel, cat_sel, start_date, end_date, palabras)
+    clave = ("scatter-plot", datos.version, clave_filtros(*filtros))
+    return responder("scatter-plot", clave, lambda: puntos_scatter(datos, *filtros), figura_scatter)
+
+
+@app.callback(Output("scatter-detalle", "children"), Input("scatter-plot", "clickData"), prevent_initial_call=True)
+def update_scatter_detalle(click_data):
+    if not click_data or not click_data.get("points"):
+        return dash.no_update
+    return detalle_licitacion(ingesta.actual, click_data["points"][0]["customdata"][0])
+
+
+@app.callback(Output("pie-chart", "figure"), *FILTROS, Input("tipo-toggle", "value"))
+def update_pie(region_sel, estado_sel, org_sel, cat_sel, start_date, end_date, palabras, tipo_toggle):
+    datos = ingesta.actual
+    filtros = (region_sel, estado_sel, org_sel, cat_sel, start_date, end_date, palabras)
+    clave = ("pie-chart", datos.version, clave_filtros(*filtros), tipo_toggle)
+    return responder("pie-chart", clave, lambda: tabla_agregada(datos, *filtros), lambda data: figura_pie(data, tipo_toggle))
+
+
+# precalentamiento: al iniciar y después de cada ingesta se calculan en un hilo
+# de fondo las figuras de la vista inicial (sin filtros) y de las
+# PRECALENTAR_TOP combinaciones de filtros más pedidas en el proceso (mientras
+# no haya suficientes, las regiones y estados con más licitaciones), así la
+# primera visita se sirve desde la caché de figuras
+PRECALENTAR = os.environ.get("PRECALENTAR", "1") == "1"
+PRECALENTAR_TOP = int(os.environ.get("PRECALENTAR_TOP", 10))
+_usos = Counter()
+_usos_lock = threading.Lock()
+
+
+def registrar_uso(filtros: tuple) -> None:
+    with _usos_lock:
+        _usos[clave_filtros(*filtros)] += 1
+
+
+def combinaciones_precalentar(datos, n: int = PRECALENTAR_TOP) -> list[tuple]:
+    # filtros como los envía el navegador: listas y el rango de fechas inicial del layout
+    desde, hasta = (fecha.isoformat() for fecha in rango_fechas(datos))
+    combinaciones = [clave_filtros([], [], [], [], desde, hasta)]
+    with _usos_lock:
+        combinaciones += [clave for clave, _ in _usos.most_common(n)]
+    for columna, posicion in (("Region", 0), ("Estado", 1)):
+        if isinstance(datos, AlmacenDuckDB):
+            conteo = datos.frecuencias[columna].get
+        else:
+            conteo = datos.indices[columna].conteo
+        for valor in sorted(datos.opciones[columna], key=conteo, reverse=True):
+            filtros = [(), (), (), (), desde, hasta, None]
+            filtros[posicion] = (valor,)
+            combinaciones.append(tuple(filtros))
+    # sin repetir, en orden de prioridad
+    return list(dict.fromkeys(combinaciones))[:n + 1]
+
+
+def precalentar(datos) -> None:
+    inicio = time.perf_counter()
+    combinaciones = combinaciones_precalentar(datos)
+    responder("world-map", ("world-map", datos.version), lambda: datos, figura_mapa)
+    for clave in combinaciones:
+        # el conjunto fue reemplazado por otra ingesta: se precalienta el nuevo
+        if ingesta.actual is not datos:
+            return
+        filtros = [list(valores) for valores in clave[:4]] + list(clave[4:])
+        update_region(filtros[1])
+        update_monto(*filtros)
+        update_licitaciones(*filtros)
+        update_scatter(*filtros)
+        update_pie(*filtros, "grupo")
+    logger.info("figuras precalentadas: %d combinaciones (%.2f s)", len(combinaciones), time.perf_counter() - inicio)
+
+
+def iniciar_precalentamiento(datos=None) -> None:
+    if not PRECALENTAR or not cache_figuras.maximo:
+        return
+    hilo = threading.Thread(target=precalentar, args=(datos or ingesta.actual,), name="precalentar", daemon=True)
+    hilo.start()
 
 
 # main, ejecutar código
 if __name__ == "__main__":
-    app.run(debug=True, port=8051)
+    # revisión periódica de la carpeta de volcados nuevos y precalentamiento al
+    # iniciar y después de cada ingesta, con el conjunto nuevo (con gunicorn la
+    # revisión corre en el maestro, ver gunicorn.conf.py); en modo debug el
+    # reloader de Werkzeug ejecuta este módulo también en un proceso vigilante
+    # que solo reinicia al que sirve los requests (WERKZEUG_RUN_MAIN=true), y
+    # los hilos se inician solo en este último
+    DEPURAR = True
+    if not DEPURAR or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        ingesta.al_actualizar(iniciar_precalentamiento)
+        ingesta.iniciar()
+        iniciar_precalentamiento()
+    app.run(debug=DEPURAR, port=8051)
 
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+Memoria asignada por request en los callbacks del dashboard
+
+Mide con tracemalloc el pico de memoria asignada (numpy incluido) al
+ejecutar cada callback con combinaciones de filtros representativas, sin
+caché de filtros ni de figuras (peor caso: primera vez que se pide esa
+combinación).
+
+Uso, desde la raíz del proyecto:
+
+    python benchmarks/memoria_callbacks.py
+"""
+# librerías
+from __future__ import annotations
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app  # noqa: E402
+
+# combinaciones de filtros (region, estado, organismo, categoría, inicio, fin)
+COMBINACIONES = {
+    "sin filtros": ([], [], [], [], None, None, None),
+    "rango de fechas": ([], [], [], [], "2025-01-01", "2025-03-25", None),
+    "una región": (["Región de Valparaíso"], [], [], [], "2025-01-01", "2025-03-25", None),
+    "estado": ([], ["Publicada"], [], [], "2025-02-01", "2025-03-01", None),
+    "palabras clave": ([], [], [], [], "2025-01-01", "2025-03-25", "servicio aseo"),
+}
+
+CALLBACKS = {
+    "bar-region": lambda f: app.update_region(f[1]),
+    "line-monto": lambda f: app.update_monto(*f),
+    "line-time": lambda f: app.update_licitaciones(*f),
+    "scatter-plot": lambda f: app.update_scatter(*f),
+    "pie-chart": lambda f: app.update_pie(*f, "grupo"),
+}
+
+
+def pico_asignado(funcion, *args) -> int:
+    tracemalloc.start()
+    funcion(*args)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return pico
+
+
+def limpiar_caches() -> None:
+    for nombre in ("_mascara", "_mascara_cubo"):
+        if hasattr(app, nombre):
+            getattr(app, nombre).cache_clear()
+    if hasattr(app, "cache_figuras"):
+        app.cache_figuras.limpiar()
+
+
+if __name__ == "__main__":
+    for nombre in ("licitaciones", "items"):
+        tabla = getattr(app.ingesta.actual, nombre)
+        print(f"{nombre}: {len(tabla)} filas, {tabla.memory_usage(deep=True).sum() / 1e6:.1f} MB")
+    for nombre, filtros in COMBINACIONES.items():
+        total = 0
+        detalle = []
+        for grafico, callback in CALLBACKS.items():
+            limpiar_caches()
+            pico = pico_asignado(callback, filtros)
+            total += pico
+            detalle.append(f"{grafico}={pico / 1e6:.1f}")
+        print(f"{nombre:16s} total={total / 1e6:6.1f} MB  " + " ".join(detalle))
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""
+Tiempos y memoria de la carga de datos y de las figuras del dashboard
+
+Genera volcados sintéticos de mercado_publico.detalles.json a 1x, 10x y 100x
+el tamaño del zip incluido (cada licitación se repite con otro CodigoExterno
+y montos y cantidades perturbados, conservando la forma anidada con
+$numberInt / $numberDouble) y mide, para cada tamaño:
+
+- carga del JSON (todas las entradas en memoria)
+- aplanado a columnas de licitaciones e items
+- normalización
+- carga por bloques completa (la que usa la app, sin caché)
+- cada una de las seis figuras del dashboard, con las combinaciones de
+  filtros de memoria_callbacks.py, incluida la serialización a JSON
+
+De cada etapa se registra el tiempo (mejor de --repeticiones, sin
+tracemalloc) y el pico de memoria asignada (una ejecución con tracemalloc).
+Los resultados se escriben como JSON para comparar corridas:
+
+    python benchmarks/rendimiento.py --factores 1 10 --salida resultados.json
+    python benchmarks/rendimiento.py --factores 1 10 --comparar resultados.json
+"""
+# librerías
+from __future__ import annotations
+import argparse
+import copy
+import datetime
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import plotly.io as pio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app  # noqa: E402
+from compactar import FIGURAS_COMPACTAS, compactar_figura  # noqa: E402
+from carga_datos import aplanar, construir_licitaciones, leer_detalles, normalizar  # noqa: E402
+from ingesta import ConjuntoDatos  # noqa: E402
+from memoria_callbacks import COMBINACIONES  # noqa: E402
+
+FACTORES = [1, 10, 100]
+DIR_VOLCADOS = os.path.join(tempfile.gettempdir(), "benchmark_mercado_publico")
+
+
+def _perturbar(valor, clave: str, factor: float):
+    # escala un número manteniendo su forma ({"$numberDouble": "..."}, {"$numberInt": "..."} o número)
+    if isinstance(valor, dict) and clave in valor:
+        numero = float(valor[clave]) * factor
+        texto = str(round(numero)) if clave == "$numberInt" else repr(numero)
+        return {clave: texto}
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        return valor * factor
+    return valor
+
+
+def generar_volcado(destino: str, factor: int, semilla: int = 0) -> str:
+    # escribe el volcado sintético de a una entrada, sin armarlo en memoria
+    if os.path.exists(destino):
+        return destino
+    rng = np.random.default_rng(semilla)
+    temporal = f"{destino}.tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        f.write("[")
+        primero = True
+        for entry in leer_detalles():
+            for copia in range(factor):
+                nueva = copy.deepcopy(entry) if copia else entry
+                detalle = nueva.get("detalle", {})
+                if copia:
+                    codigo = f"{detalle.get('CodigoExterno')}-S{copia}"
+                    nueva["CodigoExterno"] = codigo
+                    detalle["CodigoExterno"] = codigo
+                    escala = float(rng.uniform(0.5, 1.5))
+                    detalle["MontoEstimado"] = _perturbar(detalle.get("MontoEstimado"), "$numberDouble", escala)
+                    for item in detalle.get("Items", {}).get("Listado", []):
+                        item["Cantidad"] = _perturbar(item.get("Cantidad"), "$numberDouble", escala)
+                f.write("\n" if primero else ",\n")
+                f.write(json.dumps(nueva, ensure_ascii=False))
+                primero = False
+        f.write("]\n")
+    os.replace(temporal, destino)
+    return destino
+
+
+def medir(funcion, repeticiones: int = 1) -> dict:
+    # mejor tiempo de las repeticiones y pico de memoria de una ejecución con tracemalloc
+    tiempos = []
+    for _ in range(repeticiones):
+        gc.collect()
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+        del resultado
+    gc.collect()
+    tracemalloc.start()
+    resultado = funcion()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"segundos": round(min(tiempos), 4), "pico_mb": round(pico / 1e6, 2)}, resultado
+
+
+def figuras(datos: ConjuntoDatos, filtros: tuple) -> dict:
+    # las seis figuras del dashboard, sin caché de figuras ni de filtros
+    def limpiar():
+        app._mascara.cache_clear()
+        app._mascara_cubo.cache_clear()
+
+    def serializar(calcular):
+        def ejecutar():
+            limpiar()
+            figura = calcular()
+            # como la envía la app (ver compactar.py)
+            return len(pio.to_json(compactar_figura(figura) if FIGURAS_COMPACTAS else figura, validate=False))
+        return ejecutar
+
+    return {
+        "bar-region": serializar(lambda: app.figura_region(datos, filtros[1])),
+        "line-monto": serializar(lambda: app.figura_monto(app.tabla_agregada(datos, *filtros))),
+        "line-time": serializar(lambda: app.figura_licitaciones(app.tabla_agregada(datos, *filtros))),
+        "scatter-plot": serializar(lambda: app.figura_scatter(app.puntos_scatter(datos, *filtros))),
+        "pie-chart": serializar(lambda: app.figura_pie(app.tabla_agregada(datos, *filtros), "grupo")),
+        "world-map": serializar(lambda: app.figura_mapa(datos)),
+    }
+
+
+def medir_factor(ruta: str, factor: int, repeticiones: int) -> list[dict]:
+    resultados = []
+
+    def registrar(etapa: str, medicion: dict, **extra) -> None:
+        resultados.append({"factor": factor, "etapa": etapa, **medicion, **extra})
+        print(f"x{factor:<4d} {etapa:40s} {medicion['segundos']:9.3f} s {medicion['pico_mb']:9.1f} MB", file=sys.stderr)
+
+    medicion, entries = medir(lambda: list(leer_detalles(ruta)), repeticiones)
+    registrar("carga_json", medicion, entradas=len(entries))
+    medicion, (columnas_licitaciones, columnas_items) = medir(lambda: aplanar(entries), repeticiones)
+    registrar("aplanado", medicion)
+    del entries
+    medicion, (licitaciones, items) = medir(
+        lambda: normalizar(pd.DataFrame(columnas_licitaciones), pd.DataFrame(columnas_items)), repeticiones
+    )
+    registrar("normalizacion", medicion, licitaciones=len(licitaciones), items=len(items))
+    del columnas_licitaciones, columnas_items, licitaciones, items
+    medicion, (licitaciones, items) = medir(lambda: construir_licitaciones(ruta), repeticiones)
+    registrar("carga_por_bloques", medicion, licitaciones=len(licitaciones), items=len(items))
+    medicion, datos = medir(lambda: ConjuntoDatos(licitaciones, items, f"benchmark-x{factor}"), repeticiones)
+    registrar("indices_y_cubo", medicion, filas_cubo=len(datos.cubo))
+
+    for combinacion, filtros in COMBINACIONES.items():
+        for grafico, funcion in figuras(datos, filtros).items():
+            medicion, bytes_json = medir(funcion, repeticiones)
+            registrar(f"{grafico} [{combinacion}]", medicion, grafico=grafico, filtros=combinacion, bytes=bytes_json)
+    return resultados
+
+
+def comparar(actual: list[dict], anterior: list[dict]) -> None:
+    # razón actual / anterior por etapa y factor
+    previos = {(r["factor"], r["etapa"]): r for r in anterior}
+    print(f"{'factor':>6s} {'etapa':40s} {'tiempo':>8s} {'memoria':>8s}")
+    for r in actual:
+        previo = previos.get((r["factor"], r["etapa"]))
+        if previo is None:
+            continue
+        razon_tiempo = r["segundos"] / previo["segundos"] if previo["segundos"] else float("nan")
+        razon_memoria = r["pico_mb"] / previo["pico_mb"] if previo["pico_mb"] else float("nan")
+        print(f"{r['factor']:>6d} {r['etapa']:40s} {razon_tiempo:7.2f}x {razon_memoria:7.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de carga de datos y figuras con volcados sintéticos.")
+    parser.add_argument("--factores", type=int, nargs="+", default=FACTORES, help="tamaños relativos al zip incluido")
+    parser.add_argument("--repeticiones", type=int, default=1, help="repeticiones para el tiempo (se usa el mejor)")
+    parser.add_argument("--dir", default=DIR_VOLCADOS, help="carpeta de los volcados sintéticos (se reutilizan)")
+    parser.add_argument("--salida", help="archivo JSON de resultados (por defecto, salida estándar)")
+    parser.add_argument("--comparar", help="resultados JSON de una corrida anterior")
+    args = parser.parse_args()
+
+    os.makedirs(args.dir, exist_ok=True)
+    resultados = []
+    for factor in args.factores:
+        ruta = generar_volcado(os.path.join(args.dir, f"detalles_x{factor}.json"), factor)
+        resultados.extend(medir_factor(ruta, factor, args.repeticiones))
+    reporte = {
+        "fecha": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "plataforma": platform.platform(),
+        "resultados": resultados,
+    }
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(reporte, f, ensure_ascii=False, indent=1)
+    else:
+        json.dump(reporte, sys.stdout, ensure_ascii=False, indent=1)
+        print()
+    if args.comparar:
+        with open(args.comparar, "r", encoding="utf-8") as f:
+            comparar(resultados, json.load(f)["resultados"])
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+Caché de figuras del dashboard
+
+Guarda cada figura según el gráfico, la versión de los datos y la tupla
+normalizada de filtros, para no recalcular las combinaciones de filtros que
+se repiten (sin filtros, una región, un rango de fechas...).
+
+Tiene dos niveles, ambos con expulsión LRU y tamaño máximo:
+
+- memoria del proceso (siempre), con el dict de la figura, que Dash
+  serializa al responder
+- carpeta compartida en disco (opcional), con el JSON de la figura, visible
+  para todos los workers de gunicorn que apunten a la misma carpeta
+
+Configuración por variables de entorno:
+
+- CACHE_FIGURAS_MAX: número máximo de figuras por nivel (128 por defecto, 0 desactiva la caché)
+- CACHE_FIGURAS_DIR: carpeta del nivel en disco (sin definir: solo memoria)
+"""
+# librerías
+from __future__ import annotations
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable
+
+import plotly.io as pio
+
+from metricas import metricas
+
+
+class CacheFiguras:
+
+    def __init__(self, maximo: int = 128, directorio: str | None = None):
+        self.maximo = maximo
+        self.directorio = directorio
+        self._memoria: OrderedDict[str, dict] = OrderedDict()
+        self._lock = threading.Lock()
+        # contadores del proceso
+        self.aciertos_memoria = 0
+        self.aciertos_disco = 0
+        self.fallos = 0
+        if directorio and maximo:
+            os.makedirs(directorio, exist_ok=True)
+
+    @classmethod
+    def desde_entorno(cls) -> "CacheFiguras":
+        return cls(
+            maximo=int(os.environ.get("CACHE_FIGURAS_MAX", 128)),
+            directorio=os.environ.get("CACHE_FIGURAS_DIR") or None,
+        )
+
+    @staticmethod
+    def _hash(clave: tuple) -> str:
+        return hashlib.sha256(repr(clave).encode("utf-8")).hexdigest()
+
+    def obtener_o_calcular(self, clave: tuple, calcular: Callable):
+        # devuelve la figura (dict) de la caché o la calcula y la guarda
+        if not self.maximo:
+            return calcular()
+        h = self._hash(clave)
+        with self._lock:
+            figura = self._memoria.get(h)
+            if figura is not None:
+                self._memoria.move_to_end(h)
+                self.aciertos_memoria += 1
+                return figura
+        texto = self._leer_disco(h)
+        if texto is not None:
+            figura = json.loads(texto)
+            with self._lock:
+                self.aciertos_disco += 1
+            self._guardar_memoria(h, figura)
+            return figura
+        with self._lock:
+            self.fallos += 1
+        figura = calcular()
+        # en memoria queda el dict de la figura, que Dash serializa al
+        # responder; el texto JSON solo se arma para el nivel en disco (o para
+        # medir su tamaño con las métricas activas)
+        if hasattr(figura, "to_plotly_json"):
+            figura = figura.to_plotly_json()
+        self._guardar_memoria(h, figura)
+        if self.directorio or metricas.activas:
+            # el primer elemento de la clave identifica el gráfico
+            with metricas.etapa("serializacion", grafico=clave[0]):
+                texto = pio.to_json(figura, validate=False)
+            metricas.observar("dashboard_figura_bytes", len(texto), grafico=clave[0])
+            self._escribir_disco(h, texto)
+        return figura
+
+    def _guardar_memoria(self, h: str, figura: dict) -> None:
+        with self._lock:
+            self._memoria[h] = figura
+            self._memoria.move_to_end(h)
+            while len(self._memoria) > self.maximo:
+                self._memoria.popitem(last=False)
+
+    def _leer_disco(self, h: str) -> str | None:
+        if not self.directorio:
+            return None
+        ruta = os.path.join(self.directorio, f"{h}.json")
+        try:
+            with open(ruta, "r", encoding="utf-8") as f:
+                texto = f.read()
+            # la fecha de modificación marca el último uso (LRU entre procesos)
+            os.utime(ruta)
+        except FileNotFoundError:
+            return None
+        return texto
+
+    def _escribir_disco(self, h: str, texto: str) -> None:
+        if not self.directorio:
+            return
+        ruta = os.path.join(self.directorio, f"{h}.json")
+        temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            f.write(texto)
+        os.replace(temporal, ruta)
+        # expulsar las figuras usadas hace más tiempo
+        archivos = []
+        for entrada in os.scandir(self.directorio):
+            if entrada.name.endswith(".json"):
+                try:
+                    archivos.append((entrada.stat().st_mtime, entrada.path))
+                except FileNotFoundError:
+                    continue
+        if len(archivos) > self.maximo:
+            archivos.sort()
+            for _, anterior in archivos[:len(archivos) - self.maximo]:
+                try:
+                    os.remove(anterior)
+                except FileNotFoundError:
+                    pass
+
+    def limpiar(self) -> None:
+        with self._lock:
+            self._memoria.clear()
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            return {
+                "aciertos_memoria": self.aciertos_memoria,
+                "aciertos_disco": self.aciertos_disco,
+                "fallos": self.fallos,
+                "figuras_en_memoria": len(self._memoria),
+                "maximo": self.maximo,
+                "directorio": self.directorio,
+            }
@@ -0,0 +1,530 @@
+# -*- coding: utf-8 -*-
+"""
+Carga de licitaciones de Mercado Público
+
+Lee el volcado JSON de detalles de licitaciones (exportación de MongoDB) de
+forma incremental, sin cargar el archivo completo en memoria, y construye dos
+tablas normalizadas que usa el dashboard, unidas por CodigoExterno:
+
+- licitaciones: una fila por licitación (cabecera: organismo, región, monto,
+  fechas, duración del contrato, tipo, descripción)
+- items: una fila por item de la licitación (producto, cantidad, categoría)
+
+La fuente puede ser un solo volcado (.json o .zip) o una carpeta o patrón
+glob con varios (por ejemplo, uno por mes). Con varios volcados, cada uno se
+procesa en un proceso aparte y los resultados se concatenan en orden de
+nombre. Si un CodigoExterno aparece más de una vez (en el mismo volcado o en
+varios) se conserva la versión con fecha_detalle_actualizado más reciente y,
+con la misma fecha, la última.
+
+Las tablas normalizadas se guardan en una caché columnar (Arrow IPC, sin
+compresión) identificada por el hash del archivo fuente, de modo que los
+siguientes arranques solo leen la caché mapeada en memoria.
+
+Uso como script para construir la caché o medir tiempo de carga y memoria:
+
+    python carga_datos.py [ruta.json|ruta.zip|carpeta|"patrón*.zip"] [--construir-cache] [--sin-cache] [--procesos N]
+"""
+# librerías
+from __future__ import annotations
+import argparse
+import glob
+import hashlib
+import io
+import json
+import os
+import re
+import resource
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, suppress
+from typing import Iterator
+
+import pandas as pd
+
+# rutas por defecto: el JSON extraído si existe, si no se lee directo del zip
+RUTA_JSON = "mercado_publico.detalles.json"
+RUTA_ZIP = "json_detalles_MP.zip"
+# otra fuente (archivo, carpeta o patrón glob de volcados) por variable de entorno
+FUENTE_DETALLES = os.environ.get("FUENTE_DETALLES")
+EXTENSIONES_FUENTE = (".json", ".zip")
+# procesos para cargar varios volcados en paralelo (por defecto, uno por CPU)
+PROCESOS_CARGA = int(os.environ.get("PROCESOS_CARGA", 0)) or None
+
+# carpeta de la caché columnar del DataFrame normalizado
+DIR_CACHE = os.environ.get("CACHE_LICITACIONES", "cache")
+# incrementar al cambiar aplanar/normalizar para invalidar cachés antiguas
+VERSION_CACHE = 7
+# versiones que se conservan de cada archivo de la caché (la recién escrita y
+# las anteriores más recientes): con gunicorn, los workers que terminan sus
+# requests con el conjunto anterior todavía leen los archivos de su versión
+CACHE_VERSIONES = int(os.environ.get("CACHE_VERSIONES", 2))
+
+# ventana de fechas de publicación que se carga: desde (incluida) y hasta
+# (excluida, opcional), en formato AAAA-MM-DD
+FECHA_CARGA_DESDE = pd.Timestamp(os.environ.get("FECHA_CARGA_DESDE", "2024-01-01"))
+FECHA_CARGA_HASTA = pd.Timestamp(os.environ["FECHA_CARGA_HASTA"]) if os.environ.get("FECHA_CARGA_HASTA") else None
+
+# número de licitaciones que se aplanan antes de convertir a columnas
+TAM_BLOQUE = 1000
+# tamaño de cada lectura del archivo (caracteres)
+TAM_LECTURA = 1 << 20
+
+# columnas de la tabla de licitaciones (una fila por licitación)
+COLUMNAS_LICITACION = [
+    "CodigoExterno",
+    "NombreLicitacion",
+    "Descripcion",
+    "Region",
+    "Organismo",
+    "Estado",
+    "MontoEstimado",
+    "FechaPublicacion",
+    "FechaCierre",
+    "TiempoDuracionContrato",
+    "UnidadTiempoDuracionContrato",
+    "CodigoTipo",
+    "Tipo",
+    "ComunaComprador",
+    "NombreUnidad",
+    "FechaActualizacion",
+]
+
+# columnas de la tabla de items (una fila por item, CodigoExterno referencia la licitación)
+COLUMNAS_ITEM = [
+    "CodigoExterno",
+    "CodigoProducto",
+    "NombreProducto",
+    "CantidadProducto",
+    "Categoria",
+]
+
+# columnas de texto con muchos valores repetidos que se guardan como
+# categóricas (un código entero por fila y cada texto una sola vez)
+CATEGORICAS_LICITACION = ["Region", "Estado", "Organismo", "Tipo", "ComunaComprador", "NombreUnidad"]
+CATEGORICAS_ITEM = ["CodigoExterno", "NombreProducto", "Categoria"]
+
+# columnas de texto libre que no quedan en la tabla en memoria: se guardan en
+# la caché y se leen (mapeadas en memoria) solo cuando se piden
+COLUMNAS_DIFERIDAS = ["Descripcion"]
+
+# tablas guardadas en la caché
+TABLAS = ("licitaciones", "items")
+
+# días por unidad de UnidadTiempoDuracionContrato como fracción (numerador, denominador):
+# 1 = horas, 3 = semanas, 4 = meses, 5 = años. Días (2) y códigos desconocidos
+# quedan sin convertir
+DIAS_POR_UNIDAD = {
+    1: (1, 24),
+    3: (7, 1),
+    4: (30, 1),
+    5: (365, 1),
+}
+
+# separadores entre elementos del arreglo JSON
+_SEPARADORES = re.compile(r"[\s,]*")
+
+
+def ruta_por_defecto() -> str:
+    if FUENTE_DETALLES:
+        return FUENTE_DETALLES
+    return RUTA_JSON if os.path.exists(RUTA_JSON) else RUTA_ZIP
+
+
+def expandir_fuentes(ruta: str) -> list[str]:
+    # volcados de una carpeta o de un patrón glob, en orden de nombre
+    if os.path.isdir(ruta):
+        archivos = [os.path.join(ruta, nombre) for nombre in os.listdir(ruta)]
+    elif any(caracter in ruta for caracter in "*?["):
+        archivos = glob.glob(ruta)
+    else:
+        return [ruta]
+    fuentes = sorted(a for a in archivos if a.endswith(EXTENSIONES_FUENTE) and os.path.isfile(a))
+    if not fuentes:
+        raise FileNotFoundError(f"no hay volcados .json ni .zip en {ruta}")
+    return fuentes
+
+
+@contextmanager
+def abrir_fuente(ruta: str):
+    # abre el JSON de detalles como texto, leyendo desde el zip si corresponde
+    if ruta.endswith(".zip"):
+        with zipfile.ZipFile(ruta) as zf:
+            nombre = next(n for n in zf.namelist() if n.endswith(".json"))
+            with zf.open(nombre) as binario:
+                yield io.TextIOWrapper(binario, encoding="utf-8")
+    else:
+        with open(ruta, "r", encoding="utf-8") as file:
+            yield file
+
+
+def leer_detalles(ruta: str | None = None, tam_lectura: int = TAM_LECTURA) -> Iterator[dict]:
+    # recorre el arreglo JSON entregando una licitación a la vez
+    decoder = json.JSONDecoder()
+    with abrir_fuente(ruta or ruta_por_defecto()) as file:
+        buffer = file.read(tam_lectura).lstrip()
+        if not buffer.startswith("["):
+            raise ValueError("se esperaba un arreglo JSON de detalles")
+        pos = 1
+        while True:
+            pos = _SEPARADORES.match(buffer, pos).end()
+            if pos < len(buffer) and buffer[pos] == "]":
+                return
+            try:
+                if pos == len(buffer):
+                    raise json.JSONDecodeError("fin del bloque", buffer, pos)
+                entry, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # el elemento quedó cortado: leer más del archivo y reintentar
+                extra = file.read(tam_lectura)
+                if not extra:
+                    raise
+                buffer = buffer[pos:] + extra
+                pos = 0
+                continue
+            yield entry
+
+
+def _desanidar(valor, clave: str):
+    # los números vienen como {"$numberInt": "..."} en la exportación de MongoDB
+    if isinstance(valor, dict):
+        return valor.get(clave)
+    return valor
+
+
+def aplanar(entries) -> tuple[dict[str, list], dict[str, list]]:
+    # extraer información tabular desde la sección 'detalle', en columnas:
+    # una fila de cabecera por licitación y una fila por cada item
+    licitaciones = {c: [] for c in COLUMNAS_LICITACION}
+    # _fila: posición de la licitación de cada item entre las licitaciones del bloque
+    items = {c: [] for c in [*COLUMNAS_ITEM, "_fila"]}
+    for entry in entries:
+        detalle = entry.get("detalle", {})
+        fechas = detalle.get("Fechas", {})
+        listado = detalle.get("Items", {}).get("Listado", [])
+        # solo licitaciones con items, como en el resto del dashboard
+        if not listado:
+            continue
+        comprador = detalle.get("Comprador", {})
+        codigo = detalle.get("CodigoExterno")
+        # {"$date": {"$numberLong": "<milisegundos>"}}
+        actualizado = _desanidar(_desanidar(entry.get("fecha_detalle_actualizado"), "$date"), "$numberLong")
+
+        for columna, valor in (
+            ("CodigoExterno", codigo),
+            ("NombreLicitacion", detalle.get("Nombre")),
+            ("Descripcion", detalle.get("Descripcion")),
+            ("Region", comprador.get("RegionUnidad")),
+            ("Organismo", comprador.get("NombreOrganismo")),
+            ("Estado", detalle.get("Estado")),
+            ("MontoEstimado", _desanidar(detalle.get("MontoEstimado"), "$numberDouble")),
+            ("FechaPublicacion", fechas.get("FechaPublicacion")),
+            ("FechaCierre", fechas.get("FechaCierre")),
+            ("TiempoDuracionContrato", detalle.get("TiempoDuracionContrato")),
+            ("UnidadTiempoDuracionContrato", _desanidar(detalle.get("UnidadTiempoDuracionContrato"), "$numberInt")),
+            ("CodigoTipo", _desanidar(detalle.get("CodigoTipo"), "$numberInt")),
+            ("Tipo", detalle.get("Tipo")),
+            ("ComunaComprador", _desanidar(detalle.get("Comprador"), "ComunaUnidad")),
+            ("NombreUnidad", _desanidar(detalle.get("Comprador"), "NombreUnidad")),
+            ("FechaActualizacion", actualizado),
+        ):
+            licitaciones[columna].append(valor)
+
+        # campos propios de cada item
+        fila = len(licitaciones["CodigoExterno"]) - 1
+        for item in listado:
+            items["_fila"].append(fila)
+            items["CodigoExterno"].append(codigo)
+            items["CodigoProducto"].append(_desanidar(item.get("CodigoProducto"), "$numberInt"))
+            items["NombreProducto"].append(item.get("NombreProducto"))
+            items["CantidadProducto"].append(_desanidar(item.get("Cantidad"), "$numberDouble"))
+            items["Categoria"].append(item.get("Categoria"))
+    return licitaciones, items
+
+
+def normalizar(licitaciones: pd.DataFrame, items: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    # normalización de campos
+    df = licitaciones
+    df["ComunaComprador"] = df["ComunaComprador"].apply(lambda x: "No indica" if not x else x)
+    df["FechaPublicacion"] = pd.to_datetime(df["FechaPublicacion"], errors="coerce", format="ISO8601")
+    df["FechaCierre"] = pd.to_datetime(df["FechaCierre"], errors="coerce", format="ISO8601")
+    df["FechaActualizacion"] = pd.to_datetime(pd.to_numeric(df["FechaActualizacion"], errors="coerce"), unit="ms")
+    df["MontoEstimado"] = pd.to_numeric(df["MontoEstimado"], errors="coerce")
+    # enteros chicos con el menor tipo que los contiene; CodigoTipo puede faltar
+    df['UnidadTiempoDuracionContrato'] = df['UnidadTiempoDuracionContrato'].astype("int8")
+    df['TiempoDuracionContrato'] = df['TiempoDuracionContrato'].astype("int32")
+    df["CodigoTipo"] = pd.to_numeric(df["CodigoTipo"], errors="coerce").astype("Int8")
+    df["Region"] = df["Region"].str.strip()
+    df["Organismo"] = df["Organismo"].str.strip()
+    # duración del contrato en días según la unidad, en una sola pasada vectorizada
+    unidad = df['UnidadTiempoDuracionContrato']
+    numerador = unidad.map({u: n for u, (n, _) in DIAS_POR_UNIDAD.items()}).fillna(1)
+    denominador = unidad.map({u: d for u, (_, d) in DIAS_POR_UNIDAD.items()}).fillna(1)
+    df['unidad_format'] = df['TiempoDuracionContrato'].astype(float) * numerador / denominador
+    # considerar licitaciones de la ventana de carga (desde 2024 por defecto), y
+    # solo los items de esas licitaciones; las fechas nulas quedan fuera
+    en_ventana = df['FechaPublicacion'] >= FECHA_CARGA_DESDE
+    if FECHA_CARGA_HASTA is not None:
+        en_ventana &= df['FechaPublicacion'] < FECHA_CARGA_HASTA
+    df = df.loc[en_ventana]
+    items["CantidadProducto"] = pd.to_numeric(items["CantidadProducto"], errors="coerce").astype("float32")
+    # códigos UNSPSC de 8 dígitos
+    items["CodigoProducto"] = pd.to_numeric(items["CodigoProducto"], errors="coerce").astype("Int32")
+    items = items.loc[items["CodigoExterno"].isin(df["CodigoExterno"])]
+    return df, items
+
+
+def _bloques(entries, tam_bloque: int):
+    bloque = []
+    for entry in entries:
+        bloque.append(entry)
+        if len(bloque) >= tam_bloque:
+            yield bloque
+            bloque = []
+    if bloque:
+        yield bloque
+
+
+def _procesar_fuente(ruta: str, tam_bloque: int = TAM_BLOQUE) -> tuple[pd.DataFrame, pd.DataFrame]:
+    # cada bloque se aplana y normaliza por separado, así la memoria máxima
+    # depende del tamaño del bloque y no del tamaño del volcado. Las tablas
+    # llevan _fila, la posición de la licitación (de la licitación de cada item)
+    # en el volcado, para deduplicar
+    partes_licitaciones, partes_items = [], []
+    filas = 0
+    for bloque in _bloques(leer_detalles(ruta), tam_bloque):
+        licitaciones, items = aplanar(bloque)
+        n = len(licitaciones["CodigoExterno"])
+        if not n:
+            continue
+        licitaciones, items = normalizar(pd.DataFrame(licitaciones), pd.DataFrame(items))
+        partes_licitaciones.append(licitaciones.assign(_fila=licitaciones.index.to_numpy() + filas))
+        partes_items.append(items.assign(_fila=items["_fila"] + filas))
+        filas += n
+    if not partes_licitaciones:
+        licitaciones, items = normalizar(
+            pd.DataFrame({**{c: pd.Series(dtype=object) for c in COLUMNAS_LICITACION}, "_fila": pd.Series(dtype="int64")}),
+            pd.DataFrame({**{c: pd.Series(dtype=object) for c in COLUMNAS_ITEM}, "_fila": pd.Series(dtype="int64")}),
+        )
+        partes_licitaciones, partes_items = [licitaciones], [items]
+    return pd.concat(partes_licitaciones, ignore_index=True), pd.concat(partes_items, ignore_index=True)
+
+
+def construir_licitaciones(ruta: str | None = None, tam_bloque: int = TAM_BLOQUE,
+                           procesos: int | None = PROCESOS_CARGA) -> tuple[pd.DataFrame, pd.DataFrame]:
+    fuentes = expandir_fuentes(ruta or ruta_por_defecto())
+    if len(fuentes) == 1:
+        partes = [_procesar_fuente(fuentes[0], tam_bloque)]
+    else:
+        # un volcado por proceso; map conserva el orden de las fuentes
+        with ProcessPoolExecutor(max_workers=min(procesos or os.cpu_count() or 1, len(fuentes))) as pool:
+            partes = list(pool.map(_procesar_fuente, fuentes, [tam_bloque] * len(fuentes)))
+    licitaciones = pd.concat([l.assign(_fuente=i) for i, (l, _) in enumerate(partes)], ignore_index=True)
+    items = pd.concat([it.assign(_fuente=i) for i, (_, it) in enumerate(partes)], ignore_index=True)
+    # una versión por CodigoExterno, también dentro de un solo volcado
+    licitaciones, items = deduplicar(licitaciones, items)
+    # categóricas después de concatenar, para que todos los bloques compartan categorías
+    licitaciones, items = categorizar(licitaciones, items)
+    return ordenar_por_fecha(licitaciones), items
+
+
+def deduplicar(licitaciones: pd.DataFrame, items: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    # una versión por CodigoExterno: la de fecha de actualización más reciente y,
+    # sin fecha o con la misma fecha, la del último volcado y, dentro del volcado,
+    # la última. _fuente (número de volcado) y _fila (posición en el volcado)
+    # identifican cada licitación y la licitación de cada item; se quitan al terminar
+    orden = licitaciones.sort_values(["FechaActualizacion", "_fuente", "_fila"], na_position="first")
+    vigentes = orden.drop_duplicates("CodigoExterno", keep="last").sort_index()
+    # items de la versión conservada
+    clave_vigente = pd.MultiIndex.from_arrays([vigentes["_fuente"], vigentes["_fila"]])
+    clave_items = pd.MultiIndex.from_arrays([items["_fuente"], items["_fila"]])
+    items = items.loc[clave_items.isin(clave_vigente)]
+    privadas = ["_fuente", "_fila"]
+    return vigentes.drop(columns=privadas).reset_index(drop=True), items.drop(columns=privadas).reset_index(drop=True)
+
+
+def categorizar(licitaciones: pd.DataFrame, items: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    # columnas de filtro como categóricas, sin categorías que ya no aparecen
+    # (por ejemplo, después de reemplazar licitaciones en una ingesta)
+    for columna in CATEGORICAS_LICITACION:
+        licitaciones[columna] = licitaciones[columna].astype("category").cat.remove_unused_categories()
+    for columna in CATEGORICAS_ITEM:
+        items[columna] = items[columna].astype("category").cat.remove_unused_categories()
+    return licitaciones, items
+
+
+def ordenar_por_fecha(licitaciones: pd.DataFrame) -> pd.DataFrame:
+    # licitaciones ordenadas por FechaPublicacion (orden estable): los filtros de
+    # fecha del panel son un tramo contiguo de filas que se ubica con búsqueda binaria
+    return licitaciones.sort_values("FechaPublicacion", kind="stable", ignore_index=True)
+
+
+def huella_fuente(ruta: str) -> str:
+    # hash del archivo fuente (y de la versión del formato y la ventana de
+    # carga) que identifica la caché
+    h = hashlib.sha256(f"v{VERSION_CACHE}|{FECHA_CARGA_DESDE}|{FECHA_CARGA_HASTA}".encode())
+    with open(ruta, "rb") as file:
+        for bloque in iter(lambda: file.read(TAM_LECTURA), b""):
+            h.update(bloque)
+    return h.hexdigest()[:20]
+
+
+def huella_fuentes(ruta: str) -> str:
+    # huella de un volcado, o combinada de los volcados de una carpeta o patrón
+    fuentes = expandir_fuentes(ruta)
+    if len(fuentes) == 1:
+        return huella_fuente(fuentes[0])
+    huellas = "+".join(huella_fuente(fuente) for fuente in fuentes)
+    return hashlib.sha256(huellas.encode()).hexdigest()[:20]
+
+
+def rutas_cache(ruta: str | None = None) -> dict[str, str]:
+    return rutas_por_huella(huella_fuentes(ruta or ruta_por_defecto()))
+
+
+def rutas_por_huella(huella: str) -> dict[str, str]:
+    return {tabla: os.path.join(DIR_CACHE, f"{tabla}-{huella}.arrow") for tabla in TABLAS}
+
+
+def guardar_cache(tablas: dict[str, pd.DataFrame], rutas: dict[str, str]) -> None:
+    # Arrow IPC sin compresión para poder mapear el archivo en memoria al leerlo
+    from pyarrow import feather
+
+    os.makedirs(DIR_CACHE, exist_ok=True)
+    for tabla, destino in rutas.items():
+        temporal = f"{destino}.{os.getpid()}.tmp"
+        feather.write_feather(tablas[tabla], temporal, compression="uncompressed")
+        # reemplazo atómico: otros procesos nunca ven una caché a medio escribir
+        os.replace(temporal, destino)
+    # eliminar cachés de volcados anteriores
+    eliminar_versiones_antiguas(rutas[TABLAS[0]], TABLAS)
+
+
+def eliminar_versiones_antiguas(ruta: str, prefijos: tuple[str, ...]) -> None:
+    # ruta es un archivo <prefijo>-<huella>.<extensión> de la versión vigente;
+    # elimina los archivos de los mismos prefijos y extensión de las versiones
+    # fuera de las CACHE_VERSIONES más recientes (por fecha de modificación).
+    # La versión vigente siempre se conserva
+    directorio = os.path.dirname(ruta) or "."
+    extension = os.path.splitext(ruta)[1]
+    vigente = os.path.basename(ruta).partition("-")[2]
+    versiones: dict[str, list[str]] = {}
+    modificadas: dict[str, float] = {}
+    with os.scandir(directorio) as entradas:
+        for entrada in entradas:
+            prefijo, _, resto = entrada.name.partition("-")
+            if prefijo not in prefijos or not resto.endswith(extension) or resto == vigente:
+                continue
+            versiones.setdefault(resto, []).append(entrada.path)
+            modificadas[resto] = max(modificadas.get(resto, 0.0), entrada.stat().st_mtime)
+    anteriores = sorted(versiones, key=modificadas.get, reverse=True)
+    for version in anteriores[max(CACHE_VERSIONES - 1, 0):]:
+        for archivo in versiones[version]:
+            # otro proceso pudo eliminarlo antes
+            with suppress(FileNotFoundError):
+                os.remove(archivo)
+
+
+def leer_cache(rutas: dict[str, str]) -> dict[str, pd.DataFrame]:
+    # las columnas diferidas quedan fuera: mapeadas en memoria no se leen del disco
+    from pyarrow import feather
+
+    tablas = {}
+    for tabla, destino in rutas.items():
+        arrow = feather.read_table(destino, memory_map=True)
+        tablas[tabla] = arrow.drop_columns([c for c in COLUMNAS_DIFERIDAS if c in arrow.column_names]).to_pandas()
+    return tablas
+
+
+def leer_diferidas(ruta_licitaciones: str, n_filas: int) -> pd.DataFrame:
+    # columnas diferidas de la caché de licitaciones, alineadas con sus filas;
+    # vacías si no hay caché (por ejemplo, sin pyarrow)
+    try:
+        from pyarrow import feather
+
+        return feather.read_table(ruta_licitaciones, columns=COLUMNAS_DIFERIDAS, memory_map=True).to_pandas()
+    except (ImportError, FileNotFoundError):
+        return pd.DataFrame({c: pd.Series([None] * n_filas, dtype=object) for c in COLUMNAS_DIFERIDAS})
+
+
+def cargar_licitaciones(ruta: str | None = None, tam_bloque: int = TAM_BLOQUE, usar_cache: bool = True,
+                        procesos: int | None = PROCESOS_CARGA) -> tuple[pd.DataFrame, pd.DataFrame]:
+    # lee la caché si corresponde al archivo fuente actual; si no, procesa el
+    # JSON y deja la caché escrita para el próximo arranque (requiere pyarrow).
+    # Con caché, las columnas diferidas (Descripcion) no se cargan; sin caché
+    # quedan en la tabla
+    ruta = ruta or ruta_por_defecto()
+    if not usar_cache:
+        return construir_licitaciones(ruta, tam_bloque, procesos)
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return construir_licitaciones(ruta, tam_bloque, procesos)
+    rutas = rutas_cache(ruta)
+    if not all(os.path.exists(destino) for destino in rutas.values()):
+        licitaciones, items = construir_licitaciones(ruta, tam_bloque, procesos)
+        guardar_cache({"licitaciones": licitaciones, "items": items}, rutas)
+    tablas = leer_cache(rutas)
+    return tablas["licitaciones"], tablas["items"]
+
+
+def esquema_sin_compactar(tabla: pd.DataFrame) -> pd.DataFrame:
+    # la misma tabla con el esquema de objetos de Python (textos y categóricas
+    # como object, enteros y decimales de 64 bits), para comparar memoria
+    columnas = {}
+    for columna, serie in tabla.items():
+        if isinstance(serie.dtype, pd.CategoricalDtype) or pd.api.types.is_string_dtype(serie.dtype):
+            columnas[columna] = serie.astype(object)
+        elif pd.api.types.is_integer_dtype(serie.dtype):
+            columnas[columna] = serie.astype("float64" if serie.hasnans else "int64")
+        elif pd.api.types.is_float_dtype(serie.dtype):
+            columnas[columna] = serie.astype("float64")
+        else:
+            columnas[columna] = serie
+    return pd.DataFrame(columnas)
+
+
+def bytes_por_fila(tabla: pd.DataFrame) -> float:
+    return tabla.memory_usage(deep=True, index=False).sum() / max(len(tabla), 1)
+
+
+def _reporte(ruta: str | None, tam_bloque: int, usar_cache: bool, procesos: int | None) -> None:
+    inicio = time.perf_counter()
+    licitaciones, items = cargar_licitaciones(ruta, tam_bloque, usar_cache, procesos)
+    segundos = time.perf_counter() - inicio
+    # ru_maxrss viene en KB en Linux
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"fuente: {ruta or ruta_por_defecto()}")
+    print(f"licitaciones: {len(licitaciones)}")
+    print(f"items: {len(items)}")
+    print(f"tiempo de carga: {segundos:.2f} s")
+    print(f"memoria máxima (RSS): {rss_mb:.1f} MB")
+    # bytes por fila con el esquema compacto y con objetos de Python (este
+    # último con las columnas diferidas, que antes quedaban en memoria)
+    completas = licitaciones
+    if usar_cache and not set(COLUMNAS_DIFERIDAS) <= set(licitaciones.columns):
+        diferidas = leer_diferidas(rutas_cache(ruta)["licitaciones"], len(licitaciones))
+        completas = pd.concat([licitaciones, diferidas], axis=1)
+    for nombre, tabla, original in (("licitaciones", licitaciones, completas), ("items", items, items)):
+        compacto = bytes_por_fila(tabla)
+        original = bytes_por_fila(esquema_sin_compactar(original))
+        print(f"bytes por fila de {nombre}: {compacto:.0f} (sin compactar: {original:.0f}, {original / compacto:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Carga el volcado de detalles y reporta tiempo y memoria.")
+    parser.add_argument("ruta", nargs="?", default=None, help="archivo .json o .zip de detalles, o carpeta o patrón glob con varios")
+    parser.add_argument("--tam-bloque", type=int, default=TAM_BLOQUE, help="licitaciones por bloque")
+    parser.add_argument("--construir-cache", action="store_true", help="procesar el JSON y escribir la caché columnar")
+    parser.add_argument("--sin-cache", action="store_true", help="medir la carga desde el JSON ignorando la caché")
+    parser.add_argument("--procesos", type=int, default=PROCESOS_CARGA, help="procesos para cargar varios volcados")
+    args = parser.parse_args()
+    if args.construir_cache:
+        fuente = args.ruta or ruta_por_defecto()
+        rutas = rutas_cache(fuente)
+        licitaciones, items = construir_licitaciones(fuente, args.tam_bloque, args.procesos)
+        guardar_cache({"licitaciones": licitaciones, "items": items}, rutas)
+        print(f"caché escrita en {', '.join(rutas.values())}")
+    else:
+        _reporte(args.ruta, args.tam_bloque, not args.sin_cache, args.procesos)
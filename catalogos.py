@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+Catálogos de regiones y tipos de licitación para las figuras
+
+Los nombres de región del volcado se traducen a su número romano (gráfico de
+barras) y al nombre que usa regiones.json (mapa), y los códigos de tipo de
+licitación a su grupo (Público / Privado / Otro) y a una descripción corta
+(gráfico de torta).
+
+Las traducciones se aplican sobre las categorías de Region y Tipo, no fila
+por fila, y quedan como columnas categóricas (RegionRoman, RegionGeo,
+GrupoTipo, TipoDesc) del cubo, de modo que cada figura es una suma agrupada
+por esas columnas.
+"""
+# librerías
+from __future__ import annotations
+
+import pandas as pd
+
+REGION_ROMANO = {
+    "Región de Arica y Parinacota": "XV",
+    "Región de Tarapacá": "I",
+    "Región de Antofagasta": "II",
+    "Región de Atacama": "III",
+    "Región de Coquimbo": "IV",
+    "Región de Valparaíso": "V",
+    "Región Metropolitana de Santiago": "RM",
+    "Región del Libertador General Bernardo O´Higgins": "VI",
+    "Región del Maule": "VII",
+    "Región de Ñuble": "XVI",
+    "Región del Biobío": "VIII",
+    "Región de la Araucanía": "IX",
+    "Región de Los Ríos": "XIV",
+    "Región de los Lagos": "X",
+    "Región de Aysén del General Carlos Ibáñez del Campo": "XI",
+    "Región de Magallanes y de la Antártica": "XII",
+}
+
+# nombre de la región en feature.properties.Region del geojson; las que no
+# están se usan tal cual
+REGION_GEOJSON = {
+    "Región de la Araucanía": "Región de La Araucanía",
+    "Región Metropolitana de Santiago": "Región Metropolitana de Santiago",
+    "Región de Coquimbo": "Región de Coquimbo",
+    "Región del Maule": "Región del Maule",
+    "Región Aysén del General Carlos Ibáñez del Campo": "Región de Aysén del Gral.Ibañez del Campo",
+    "Región de Tarapacá": "Región de Tarapacá",
+    "Región de Atacama": "Región de Atacama",
+    "Región de Valparaíso": "Región de Valparaíso",
+    "Región de Magallanes y de la Antártica": "Región de Magallanes y Antártica Chilena",
+    "Región del Biobío": "Región del Bío-Bío",
+    "Región del Libertador General Bernardo O´Higgins": "Región del Libertador Bernardo O'Higgins",
+    "Región de Los Ríos": "Región de Los Ríos",
+    "Región del Ñuble": "Región de Ñuble",
+    "Región de los Lagos": "Región de Los Lagos",
+    "Región de Antofagasta": "Región de Antofagasta",
+    "Región de Arica y Parinacota": "Región de Arica y Parinacota",
+}
+
+TIPO_DESCRIPCION = {
+    "L1": "LP <100 UTM",
+    "LE": "LP 100‑1k",
+    "LP": "LP 1k‑2k",
+    "LQ": "LP 2k‑5k",
+    "LR": "LP >5k",
+    "E2": "LPriv <100",
+    "CO": "LPriv 100‑1k",
+    "B2": "LPriv 1k‑2k",
+    "H2": "LPriv 2k‑5k",
+    "I2": "LPriv >5k",
+    "LS": "LP Serv. pers.",
+}
+TIPOS_PUBLICOS = ["L1", "LE", "LP", "LQ", "LR", "LS"]
+TIPOS_PRIVADOS = ["E2", "CO", "B2", "H2", "I2"]
+GRUPO_TIPO = {**{tipo: "Público" for tipo in TIPOS_PUBLICOS}, **{tipo: "Privado" for tipo in TIPOS_PRIVADOS}}
+
+
+def _traducir(columna: pd.Series, traduccion, nulo=None) -> pd.Series:
+    # se traduce cada categoría una vez y las filas toman la de su código;
+    # las filas sin valor (código -1) toman el último elemento, nulo
+    columna = columna.astype("category")
+    traducidas = [traduccion(valor) for valor in columna.cat.categories] + [nulo]
+    codigos, categorias = pd.factorize(pd.Index(traducidas, dtype=object), sort=True)
+    return pd.Series(
+        pd.Categorical.from_codes(codigos[columna.cat.codes.to_numpy()], categories=categorias),
+        index=columna.index,
+    )
+
+
+def agregar_catalogos(df: pd.DataFrame) -> pd.DataFrame:
+    # columnas traducidas de las que estén en la tabla (Region y/o Tipo)
+    nuevas = {}
+    if "Region" in df.columns:
+        nuevas["RegionRoman"] = _traducir(df["Region"], REGION_ROMANO.get)
+        nuevas["RegionGeo"] = _traducir(df["Region"], lambda region: REGION_GEOJSON.get(region, region).strip())
+    if "Tipo" in df.columns:
+        nuevas["GrupoTipo"] = _traducir(df["Tipo"], lambda tipo: GRUPO_TIPO.get(tipo, "Otro"), nulo="Otro")
+        nuevas["TipoDesc"] = _traducir(df["Tipo"], lambda tipo: TIPO_DESCRIPCION.get(tipo, "Otro"), nulo="Otro")
+    return df.assign(**nuevas)
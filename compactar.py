@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+Figuras compactas para las respuestas de los callbacks
+
+Antes de guardar una figura en la caché (y de enviarla al navegador) se
+reduce su JSON:
+
+- los arreglos numéricos de las trazas (x, y, z, values...) se redondean a
+  DECIMALES_FIGURA decimales (los enteros van sin ".0") y, desde
+  MIN_ARREGLO_TIPADO valores, se envían como arreglos tipados de plotly.js
+  ({"dtype": "u2", "bdata": <base64>}, soportados desde plotly.js 2.28) con
+  el tipo más chico que conserva los valores (enteros de 1, 2 o 4 bytes,
+  float32 o float64), cuando eso ocupa menos que la lista
+- la plantilla de cada figura conserva su parte de layout, pero de la parte de
+  trazas solo los tipos de traza que usa la figura (la plantilla completa
+  trae estilos para todos los tipos, ~5 KB por figura)
+
+Configuración por variables de entorno:
+
+- FIGURAS_COMPACTAS: "0" envía las figuras tal como las arma plotly (activas por defecto)
+- DECIMALES_FIGURA: decimales de los valores numéricos (2 por defecto)
+"""
+# librerías
+from __future__ import annotations
+import base64
+import json
+import os
+
+import numpy as np
+
+FIGURAS_COMPACTAS = os.environ.get("FIGURAS_COMPACTAS", "1") == "1"
+DECIMALES_FIGURA = int(os.environ.get("DECIMALES_FIGURA", 2))
+# arreglos más cortos van como lista: el base64 no compensa
+MIN_ARREGLO_TIPADO = 32
+CAMPOS_NUMERICOS = ("x", "y", "z", "values", "lat", "lon")
+TIPOS_ENTEROS = ("u1", "i1", "u2", "i2", "u4", "i4")
+
+
+def _arreglo_tipado(valores: np.ndarray) -> dict:
+    # tipo más chico que representa los valores sin pérdida
+    if _enteros(valores):
+        for dtype in TIPOS_ENTEROS:
+            limites = np.iinfo(dtype)
+            if valores.min() >= limites.min and valores.max() <= limites.max:
+                return {"dtype": dtype, "bdata": base64.b64encode(valores.astype(f"<{dtype}").tobytes()).decode()}
+    dtype = "f4" if np.array_equal(valores.astype(np.float32), valores, equal_nan=True) else "f8"
+    return {"dtype": dtype, "bdata": base64.b64encode(valores.astype(f"<{dtype}").tobytes()).decode()}
+
+
+def _enteros(valores: np.ndarray) -> bool:
+    return bool(np.isfinite(valores).all() and np.array_equal(valores, np.round(valores)))
+
+
+def _compactar_arreglo(valores):
+    arreglo = np.asarray(valores)
+    if arreglo.ndim != 1 or arreglo.dtype.kind not in "iuf":
+        return valores
+    arreglo = np.round(arreglo.astype(np.float64), DECIMALES_FIGURA)
+    # como lista, los valores enteros van sin ".0"
+    if _enteros(arreglo):
+        lista = arreglo.astype(np.int64).tolist()
+    else:
+        lista = [int(v) if v.is_integer() else v for v in arreglo.tolist()]
+    if len(arreglo) < MIN_ARREGLO_TIPADO:
+        return lista
+    # arreglo tipado solo si ocupa menos que la lista (los montos grandes con
+    # decimales necesitan float64 y suelen ser más cortos como texto)
+    tipado = _arreglo_tipado(arreglo)
+    return tipado if len(tipado["bdata"]) < len(json.dumps(lista)) else lista
+
+
+def compactar_figura(figura) -> dict:
+    # figura de plotly (o su dict) -> dict compacto, listo para serializar
+    figura = figura.to_plotly_json() if hasattr(figura, "to_plotly_json") else dict(figura)
+    trazas = []
+    for traza in figura.get("data", []):
+        traza = dict(traza)
+        for campo in CAMPOS_NUMERICOS:
+            if campo in traza and traza[campo] is not None:
+                traza[campo] = _compactar_arreglo(traza[campo])
+        trazas.append(traza)
+    layout = dict(figura.get("layout", {}))
+    plantilla = layout.get("template")
+    if isinstance(plantilla, dict) and "data" in plantilla:
+        usados = {traza.get("type", "scatter") for traza in trazas}
+        layout["template"] = {
+            **plantilla,
+            "data": {tipo: estilo for tipo, estilo in plantilla["data"].items() if tipo in usados},
+        }
+    return {**figura, "data": trazas, "layout": layout}
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+Cubo pre-agregado de licitaciones
+
+Agrupa la tabla de licitaciones por (Region, Estado, Organismo, Tipo, día de
+publicación) con el número de licitaciones, la suma de MontoEstimado y el
+número de montos no nulos. Los gráficos agregados del dashboard se responden
+sumando filas del cubo filtrado, por lo que su costo depende del número de
+combinaciones distintas y no del número de licitaciones.
+
+Categoria es un atributo de los items y una licitación puede tener varias,
+por lo que no es dimensión del cubo: con filtro de categoría los agregados se
+calculan sobre las licitaciones seleccionadas por el índice de categorías.
+
+Al ingerir licitaciones nuevas o modificadas el cubo se actualiza sumando el
+cubo de las filas agregadas y restando el de las filas reemplazadas, sin
+volver a agrupar la tabla completa.
+
+El cubo lleva además las columnas de catalogos.py (RegionRoman, RegionGeo,
+GrupoTipo, TipoDesc), traducidas desde Region y Tipo al construirlo.
+
+Las filas del cubo quedan ordenadas por día, como la tabla de licitaciones,
+para que los filtros de fecha se resuelvan con búsqueda binaria.
+"""
+# librerías
+from __future__ import annotations
+
+import pandas as pd
+
+from catalogos import agregar_catalogos
+
+DIMENSIONES = ["Region", "Estado", "Organismo", "Tipo", "Dia"]
+MEDIDAS = ["Licitaciones", "MontoEstimado", "NMonto"]
+
+
+def construir_cubo(df: pd.DataFrame) -> pd.DataFrame:
+    base = df[["Region", "Estado", "Organismo", "Tipo", "MontoEstimado"]].assign(
+        Tipo=df["Tipo"].astype("category"),
+        Dia=df["FechaPublicacion"].dt.normalize(),
+    )
+    cubo = (
+        base.groupby(DIMENSIONES, observed=True, dropna=False)
+        .agg(
+            Licitaciones=("MontoEstimado", "size"),
+            MontoEstimado=("MontoEstimado", "sum"),
+            # montos no nulos: un grupo con todos los montos nulos no suma al gráfico de montos
+            NMonto=("MontoEstimado", "count"),
+        )
+        .reset_index()
+        .sort_values("Dia", kind="stable", ignore_index=True)
+    )
+    # fecha a nivel mes para series temporales
+    cubo["MesPublicacion"] = cubo["Dia"].dt.to_period("M").dt.to_timestamp()
+    return agregar_catalogos(cubo)
+
+
+def actualizar_cubo(cubo: pd.DataFrame, quitadas: pd.DataFrame, agregadas: pd.DataFrame, licitaciones: pd.DataFrame) -> pd.DataFrame:
+    # cubo + cubo(agregadas) - cubo(quitadas); licitaciones es la tabla ya
+    # actualizada, de donde salen las categorías de Region, Estado y Organismo
+    restar = construir_cubo(quitadas)
+    restar[MEDIDAS] = -restar[MEDIDAS]
+    # las categorías de cada parte son distintas: agrupar por los valores
+    partes = [parte[DIMENSIONES + MEDIDAS] for parte in (cubo, construir_cubo(agregadas), restar)]
+    combinado = pd.concat(partes, ignore_index=True)
+    for columna in ("Region", "Estado", "Organismo", "Tipo"):
+        combinado[columna] = combinado[columna].astype(cubo[columna].cat.categories.dtype)
+    nuevo = combinado.groupby(DIMENSIONES, dropna=False).sum().reset_index()
+    # combinaciones que quedaron sin licitaciones
+    nuevo = nuevo.loc[nuevo["Licitaciones"] > 0].sort_values("Dia", kind="stable", ignore_index=True)
+    nuevo.loc[nuevo["NMonto"] == 0, "MontoEstimado"] = 0.0
+    for columna in ("Region", "Estado", "Organismo"):
+        nuevo[columna] = pd.Categorical(nuevo[columna], categories=licitaciones[columna].cat.categories)
+    nuevo["Tipo"] = nuevo["Tipo"].astype("category")
+    nuevo["MesPublicacion"] = nuevo["Dia"].dt.to_period("M").dt.to_timestamp()
+    return agregar_catalogos(nuevo)
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+GeoJSON de regiones de Chile para el mapa del dashboard
+
+Se lee una sola vez al iniciar la app y se serializa a bytes para servirlo
+como archivo estático; el navegador lo descarga una vez y las respuestas de
+los callbacks solo envían los valores por región.
+
+Opcionalmente los polígonos se simplifican (Douglas-Peucker) con una
+tolerancia en grados, configurable con la variable de entorno
+SIMPLIFICAR_GEOJSON (por ejemplo 0.005). Sin la variable se usa la geometría
+original.
+"""
+# librerías
+from __future__ import annotations
+import hashlib
+import json
+import os
+
+import numpy as np
+
+RUTA_GEOJSON = "regiones.json"
+
+
+def _douglas_peucker(puntos: np.ndarray, tolerancia: float) -> np.ndarray:
+    # conserva los vértices que se alejan más que la tolerancia del segmento
+    n = len(puntos)
+    if n < 3:
+        return puntos
+    conservar = np.zeros(n, dtype=bool)
+    conservar[0] = conservar[-1] = True
+    pila = [(0, n - 1)]
+    while pila:
+        i, j = pila.pop()
+        if j <= i + 1:
+            continue
+        a, b = puntos[i], puntos[j]
+        tramo = puntos[i + 1:j]
+        dx, dy = b - a
+        norma = np.hypot(dx, dy)
+        if norma == 0:
+            # anillo cerrado: distancia al punto inicial
+            distancias = np.hypot(tramo[:, 0] - a[0], tramo[:, 1] - a[1])
+        else:
+            distancias = np.abs(dx * (tramo[:, 1] - a[1]) - dy * (tramo[:, 0] - a[0])) / norma
+        k = int(np.argmax(distancias))
+        if distancias[k] > tolerancia:
+            k += i + 1
+            conservar[k] = True
+            pila.append((i, k))
+            pila.append((k, j))
+    return puntos[conservar]
+
+
+def _simplificar_poligono(anillos: list, tolerancia: float) -> list | None:
+    # el primer anillo es el borde exterior; los demás son agujeros
+    resultado = []
+    for posicion, anillo in enumerate(anillos):
+        simplificado = _douglas_peucker(np.asarray(anillo, dtype=float), tolerancia)
+        if len(simplificado) < 4:
+            if posicion == 0:
+                # el polígono completo es más chico que la tolerancia
+                return None
+            continue
+        # 5 decimales (~1 m) bastan para el mapa y acortan el JSON
+        resultado.append(np.round(simplificado, 5).tolist())
+    return resultado
+
+
+def simplificar(geojson: dict, tolerancia: float) -> dict:
+    features = []
+    for feature in geojson["features"]:
+        geometria = feature["geometry"]
+        if geometria["type"] == "Polygon":
+            coordenadas = _simplificar_poligono(geometria["coordinates"], tolerancia) or geometria["coordinates"]
+        else:
+            poligonos = [_simplificar_poligono(p, tolerancia) for p in geometria["coordinates"]]
+            # descartar islas menores a la tolerancia, pero nunca la región completa
+            coordenadas = [p for p in poligonos if p] or geometria["coordinates"]
+        features.append({**feature, "geometry": {"type": geometria["type"], "coordinates": coordenadas}})
+    return {**geojson, "features": features}
+
+
+def cargar_geojson(ruta: str = RUTA_GEOJSON, tolerancia: float | None = None) -> dict:
+    with open(ruta, "r", encoding="utf-8") as f:
+        geojson = json.load(f)
+    if tolerancia is None and os.environ.get("SIMPLIFICAR_GEOJSON"):
+        tolerancia = float(os.environ["SIMPLIFICAR_GEOJSON"])
+    if tolerancia:
+        geojson = simplificar(geojson, tolerancia)
+    return geojson
+
+
+# geojson cargado una vez al importar el módulo, ya serializado para servirlo
+GEOJSON_REGIONES = cargar_geojson()
+GEOJSON_BYTES = json.dumps(GEOJSON_REGIONES, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+GEOJSON_ETAG = hashlib.sha256(GEOJSON_BYTES).hexdigest()[:16]
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+Configuración de gunicorn para el dashboard
+
+    gunicorn -c gunicorn.conf.py wsgi:server
+
+- preload_app: el proceso maestro importa la app (carga de datos, índices y
+  cubo) antes de crear los workers, que heredan las tablas con fork y las
+  comparten mientras nadie las modifique (los conjuntos de datos no se
+  modifican después de construirse)
+- gc.freeze() antes de crear los workers: el recolector de basura no vuelve
+  a recorrer los objetos cargados, así no escribe en sus páginas y estas
+  siguen compartidas
+- la carpeta de volcados nuevos se revisa solo en el maestro (when_ready):
+  el volcado se procesa una vez y un solo proceso escribe la caché. Al
+  publicar un conjunto nuevo el maestro se envía SIGHUP: gunicorn crea
+  workers nuevos con fork, que heredan el conjunto nuevo ya compartido, y
+  los anteriores terminan sus requests en curso y salen. Los archivos de la
+  versión anterior se conservan en cache/ (ver CACHE_VERSIONES en
+  carga_datos.py) mientras esos workers los lean
+- el precalentamiento de figuras corre en cada worker (post_fork): los hilos
+  de fondo no sobreviven al fork y la caché de figuras es de cada proceso
+
+Con MOTOR_DATOS=duckdb el maestro construye el almacén (al arrancar y con
+cada volcado nuevo) y solo lee de él los valores de los filtros; cada worker
+abre su propia conexión de lectura al consultar.
+
+Configuración por variables de entorno:
+
+- PORT: puerto (8051 por defecto)
+- GUNICORN_WORKERS: número de workers (número de CPUs por defecto)
+- GUNICORN_THREADS: hilos por worker (4 por defecto; los callbacks de un mismo
+  cambio de filtros llegan en paralelo)
+"""
+# librerías
+import gc
+import multiprocessing
+import os
+import signal
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 8051)}"
+workers = int(os.environ.get("GUNICORN_WORKERS", multiprocessing.cpu_count()))
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+preload_app = True
+timeout = 120
+
+
+def pre_fork(server, worker):
+    # los objetos cargados hasta aquí quedan fuera de la recolección de basura
+    gc.freeze()
+
+
+def when_ready(server):
+    # revisión de la carpeta de volcados en el maestro; cada conjunto nuevo
+    # recarga los workers, que lo heredan al crearse
+    from app import ingesta
+
+    ingesta.al_actualizar(lambda conjunto: os.kill(os.getpid(), signal.SIGHUP))
+    ingesta.iniciar()
+
+
+def post_fork(server, worker):
+    from app import iniciar_precalentamiento
+
+    iniciar_precalentamiento()
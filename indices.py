@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+Índices invertidos para los filtros del dashboard
+
+Para cada columna categórica se guarda, por valor, la lista ordenada de
+posiciones de fila donde aparece. Un filtro multi-selección se resuelve como
+la unión de esas posiciones en una máscara booleana, y varios filtros se
+combinan intersectando máscaras, sin comparar strings fila por fila.
+
+Los valores a nivel de item (Categoria) se indexan directamente sobre las
+filas de la tabla de licitaciones: cada categoría apunta a las licitaciones
+que tienen al menos un item en ella, sin repetir.
+
+Para los dropdowns con muchas opciones (Organismo, Categoría) se arma además
+un buscador: los valores ordenados por número de licitaciones con su texto en
+minúsculas y sin tildes, que devuelve los primeros que empiezan con el texto
+buscado y luego los que lo contienen. Con conteos (las filas de cada valor
+según los demás filtros) se omiten los valores sin filas y se ordena por ese
+conteo.
+"""
+# librerías
+from __future__ import annotations
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+# columnas de filtro de la tabla de licitaciones (categóricas desde la carga)
+COLUMNAS_INDICE = ["Region", "Estado", "Organismo"]
+
+
+class IndiceInvertido:
+    # valor -> posiciones de fila de una columna categórica
+
+    def __init__(self, columna: pd.Series, filas: np.ndarray | None = None, n_filas: int | None = None):
+        # filas: posición de destino de cada elemento de la columna (por ejemplo,
+        # la licitación de cada item); por defecto, la misma posición
+        codigos = columna.cat.codes.to_numpy().astype(np.int64)
+        self.codigo = {valor: i for i, valor in enumerate(columna.cat.categories)}
+        if filas is None:
+            self.n_filas = len(codigos)
+            orden = np.argsort(codigos, kind="stable")
+            self.posiciones = orden.astype(np.int32)
+            codigos_ordenados = codigos[orden]
+        else:
+            self.n_filas = n_filas
+            validas = filas >= 0
+            # pares (código, fila) únicos y ordenados en un solo entero
+            pares = np.unique(codigos[validas] * n_filas + filas[validas])
+            codigos_ordenados = pares // n_filas
+            self.posiciones = (pares % n_filas).astype(np.int32)
+        # posiciones agrupadas por código; las filas con valor nulo (código -1) quedan al inicio
+        self.limites = np.searchsorted(codigos_ordenados, np.arange(-1, len(self.codigo) + 1))
+
+    def filas(self, valor) -> np.ndarray:
+        codigo = self.codigo.get(valor)
+        if codigo is None:
+            return self.posiciones[:0]
+        # el código c ocupa posiciones[limites[c + 1]:limites[c + 2]]
+        return self.posiciones[self.limites[codigo + 1]:self.limites[codigo + 2]]
+
+    def conteo(self, valor) -> int:
+        return len(self.filas(valor))
+
+    def conteos(self, mascara: np.ndarray) -> np.ndarray:
+        # filas marcadas en la máscara por código (sin los nulos), para los
+        # conteos de cada opción de un filtro según los demás filtros activos
+        acumuladas = np.concatenate(([0], np.cumsum(mascara[self.posiciones])))
+        return acumuladas[self.limites[2:]] - acumuladas[self.limites[1:-1]]
+
+    def mascara(self, valores) -> np.ndarray:
+        # unión de las filas de todos los valores seleccionados
+        mascara = np.zeros(self.n_filas, dtype=bool)
+        for valor in valores:
+            mascara[self.filas(valor)] = True
+        return mascara
+
+
+def construir_indices(df: pd.DataFrame, columnas=COLUMNAS_INDICE) -> dict[str, IndiceInvertido]:
+    return {columna: IndiceInvertido(df[columna]) for columna in columnas}
+
+
+def indice_por_licitacion(items: pd.DataFrame, licitaciones: pd.DataFrame, columna: str) -> IndiceInvertido:
+    # índice de una columna de items sobre las filas de la tabla de licitaciones
+    filas = pd.Index(licitaciones["CodigoExterno"]).get_indexer(items["CodigoExterno"])
+    return IndiceInvertido(items[columna], filas=filas, n_filas=len(licitaciones))
+
+
+def plegar(texto) -> str:
+    # minúsculas y sin tildes, para comparar textos sin distinguir acentos
+    return unicodedata.normalize("NFKD", str(texto)).encode("ascii", "ignore").decode().lower()
+
+
+class BuscadorOpciones:
+    # valores ordenados por frecuencia, con su texto plegado
+
+    def __init__(self, valores: list, conteos: np.ndarray):
+        # valores en el orden de sus códigos y número de filas de cada uno
+        orden = np.argsort(-conteos, kind="stable")
+        self.codigos = orden[conteos[orden] > 0]
+        self.valores = [valores[i] for i in self.codigos]
+        self.textos = [plegar(valor) for valor in self.valores]
+
+    def buscar(self, texto: str | None, maximo: int = 50, conteos: np.ndarray | None = None) -> list:
+        # conteos: filas por código del índice con los demás filtros activos
+        orden = range(len(self.valores))
+        if conteos is not None:
+            disponibles = conteos[self.codigos]
+            orden = np.argsort(-disponibles, kind="stable")[:np.count_nonzero(disponibles)]
+        consulta = plegar(texto or "").strip()
+        if not consulta:
+            return [self.valores[i] for i in orden[:maximo]]
+        prefijos, contienen = [], []
+        for i in orden:
+            valor, plegado = self.valores[i], self.textos[i]
+            if plegado.startswith(consulta):
+                prefijos.append(valor)
+                if len(prefijos) == maximo:
+                    break
+            elif len(contienen) < maximo and consulta in plegado:
+                contienen.append(valor)
+        return (prefijos + contienen)[:maximo]
+
+    @classmethod
+    def desde_indice(cls, indice: IndiceInvertido) -> "BuscadorOpciones":
+        # número de filas de cada código; limites[0:1] son los nulos
+        return cls(list(indice.codigo), np.diff(indice.limites)[1:])
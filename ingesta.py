@@ -0,0 +1,374 @@
+# -*- coding: utf-8 -*-
+"""
+Ingesta incremental de volcados de detalles
+
+Los volcados nuevos (archivos .json o .zip con el mismo formato que
+mercado_publico.detalles.json, por ejemplo uno diario) se dejan en una
+carpeta y se aplican en orden de nombre sobre el volcado base. Cada volcado
+se procesa con la misma carga por bloques del volcado base, y solo las
+licitaciones nuevas o con cambios (según un hash de la cabecera y de sus
+items) reemplazan a las actuales con el mismo CodigoExterno. Una versión con
+FechaActualizacion más antigua que la actual se ignora, como en
+carga_datos.deduplicar, así el resultado es el mismo que cargar todos los
+volcados juntos.
+
+Cada ingesta produce un ConjuntoDatos nuevo (tablas, índices y cubo, este
+último actualizado de forma incremental). Los callbacks leen siempre
+`Ingesta.actual`, que se reemplaza con una sola asignación: un request en
+curso sigue usando el conjunto con que empezó y nunca ve tablas e índices de
+versiones distintas.
+
+El conjunto consolidado se guarda en la caché columnar con una huella que
+combina la del volcado base y las de los volcados aplicados, así un reinicio
+lee directamente la caché sin volver a procesar los volcados.
+
+Configuración por variables de entorno:
+
+- INGESTA_DIR: carpeta de volcados nuevos ("nuevos" por defecto)
+- INGESTA_INTERVALO: segundos entre revisiones de la carpeta (60 por defecto, 0 desactiva la revisión periódica)
+
+Para no leer un volcado a medio copiar, conviene escribirlo con otro nombre
+(o en otra carpeta del mismo disco) y moverlo a la carpeta al terminar.
+
+Uso como script para aplicar una vez los volcados pendientes:
+
+    python ingesta.py
+"""
+# librerías
+from __future__ import annotations
+import copy
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from carga_datos import (
+    COLUMNAS_DIFERIDAS,
+    COLUMNAS_ITEM,
+    COLUMNAS_LICITACION,
+    cargar_licitaciones,
+    categorizar,
+    construir_licitaciones,
+    guardar_cache,
+    huella_fuente,
+    huella_fuentes,
+    leer_cache,
+    leer_diferidas,
+    ordenar_por_fecha,
+    rutas_por_huella,
+    ruta_por_defecto,
+)
+from cubo import actualizar_cubo, construir_cubo
+from indices import BuscadorOpciones, IndiceInvertido, construir_indices, indice_por_licitacion
+from texto import IndiceTexto, ruta_indice_texto
+
+DIR_INGESTA = os.environ.get("INGESTA_DIR", "nuevos")
+INTERVALO_INGESTA = float(os.environ.get("INGESTA_INTERVALO", 60))
+EXTENSIONES = (".json", ".zip")
+
+logger = logging.getLogger(__name__)
+
+
+class ConjuntoDatos:
+    # tablas y estructuras derivadas que usan los callbacks; no se modifican
+    # después de construirse (una ingesta crea un conjunto nuevo)
+
+    def __init__(self, licitaciones: pd.DataFrame, items: pd.DataFrame, version: str,
+                 volcados: tuple[str, ...] = (), cubo: pd.DataFrame | None = None,
+                 diferidas: pd.DataFrame | None = None):
+        # los índices y las búsquedas por código suponen una fila por licitación
+        # (la carga deduplica); una tabla con códigos repetidos es un error
+        if not licitaciones["CodigoExterno"].is_unique:
+            raise ValueError("CodigoExterno repetido en la tabla de licitaciones")
+        self.licitaciones = licitaciones
+        self.items = items
+        # columnas diferidas (Descripcion) alineadas con las filas de licitaciones;
+        # sin valor se leen de la caché de esta versión cuando se piden
+        self._diferidas = diferidas
+        # versión de los datos, parte de la clave de la caché de figuras
+        self.version = version
+        # huellas de los volcados aplicados sobre el volcado base, en orden
+        self.volcados = tuple(volcados)
+        # índices invertidos (valor -> filas de licitaciones) para los filtros de Región,
+        # Estado y Organismo; Categoría se indexa desde los items hacia su licitación
+        self.indices = construir_indices(licitaciones)
+        self.indices["Categoria"] = indice_por_licitacion(items, licitaciones, "Categoria")
+        # opciones de los filtros, calculadas una vez por conjunto: Región y Estado
+        # van completas en el layout; Organismo y Categoría se buscan en el servidor
+        self.opciones = {
+            columna: sorted(valor for valor in self.indices[columna].codigo if self.indices[columna].conteo(valor))
+            for columna in ("Region", "Estado")
+        }
+        self.buscadores = {columna: BuscadorOpciones.desde_indice(self.indices[columna]) for columna in ("Organismo", "Categoria")}
+        # índice de palabras clave; se arma o se lee de la caché al pedirlo
+        self._texto = None
+        self._texto_lock = threading.Lock()
+        # cubo pre-agregado por (Region, Estado, Organismo, Tipo, día) para los gráficos agregados
+        self.cubo = construir_cubo(licitaciones) if cubo is None else cubo
+        self.indices_cubo = construir_indices(self.cubo)
+        # búsqueda de una licitación y de sus items por CodigoExterno
+        self.indice_codigo = pd.Index(licitaciones["CodigoExterno"])
+        self.items_por_licitacion = IndiceInvertido(
+            pd.Series(pd.Categorical(items["CodigoExterno"], categories=licitaciones["CodigoExterno"]))
+        )
+
+    def con_version(self, version: str, volcados: tuple[str, ...]) -> "ConjuntoDatos":
+        # mismo contenido con otra versión (volcado sin cambios)
+        conjunto = copy.copy(self)
+        conjunto.version = version
+        conjunto.volcados = tuple(volcados)
+        conjunto._diferidas = self._diferidas
+        return conjunto
+
+    def diferidas(self) -> pd.DataFrame:
+        if set(COLUMNAS_DIFERIDAS) <= set(self.licitaciones.columns):
+            # cargadas sin caché: ya están en la tabla
+            return self.licitaciones[COLUMNAS_DIFERIDAS]
+        if self._diferidas is not None:
+            return self._diferidas
+        ruta = rutas_por_huella(self.version)["licitaciones"]
+        diferidas = leer_diferidas(ruta, len(self.licitaciones))
+        # las columnas vacías de una caché que no se pudo leer no se guardan:
+        # se vuelven a leer en la próxima consulta
+        if _hay_pyarrow() and os.path.exists(ruta):
+            self._diferidas = diferidas
+        return diferidas
+
+    def texto(self) -> IndiceTexto:
+        # índice de palabras clave de la caché de esta versión, o construido y guardado
+        with self._texto_lock:
+            if self._texto is None:
+                ruta = ruta_indice_texto(self.version)
+                if _hay_pyarrow() and os.path.exists(ruta):
+                    self._texto = IndiceTexto.leer(ruta, len(self.licitaciones))
+                else:
+                    self._texto = IndiceTexto.construir(self.licitaciones, self.diferidas(), self.items)
+                    if _hay_pyarrow():
+                        self._texto.guardar(ruta)
+            return self._texto
+
+    def licitaciones_completas(self) -> pd.DataFrame:
+        # licitaciones con las columnas diferidas, para guardar o comparar
+        if set(COLUMNAS_DIFERIDAS) <= set(self.licitaciones.columns):
+            return self.licitaciones
+        return pd.concat([self.licitaciones, self.diferidas().set_axis(self.licitaciones.index)], axis=1)
+
+
+def huella_conjunto(huella_base: str, volcados) -> str:
+    # sin volcados aplicados la huella es la del volcado base (la misma caché)
+    if not volcados:
+        return huella_base
+    return hashlib.sha256("+".join([huella_base, *volcados]).encode()).hexdigest()[:20]
+
+
+def huellas_registros(licitaciones: pd.DataFrame, items: pd.DataFrame) -> pd.Series:
+    # hash por CodigoExterno de la cabecera más sus items; los items se suman,
+    # así el hash no depende del orden en que vienen
+    huellas = pd.util.hash_pandas_object(licitaciones[COLUMNAS_LICITACION], index=False).to_numpy().copy()
+    por_item = pd.util.hash_pandas_object(items[COLUMNAS_ITEM], index=False).to_numpy()
+    filas = pd.Index(licitaciones["CodigoExterno"]).get_indexer(items["CodigoExterno"])
+    validas = filas >= 0
+    np.add.at(huellas, filas[validas], por_item[validas])
+    return pd.Series(huellas, index=licitaciones["CodigoExterno"].to_numpy())
+
+
+def aplicar_volcado(conjunto: ConjuntoDatos, nuevas: pd.DataFrame, nuevos_items: pd.DataFrame,
+                    huella: str, huella_base: str) -> tuple[ConjuntoDatos, int]:
+    # devuelve el conjunto con el volcado aplicado y el número de licitaciones
+    # nuevas o modificadas
+    volcados = conjunto.volcados + (huella,)
+    version = huella_conjunto(huella_base, volcados)
+    licitaciones, items = conjunto.licitaciones_completas(), conjunto.items
+
+    # la misma regla de carga_datos.deduplicar: vale la FechaActualizacion más
+    # nueva (sin fecha cuenta como la más antigua) y, a igual fecha, el volcado
+    # aplicado después; una versión recibida más antigua que la actual se ignora
+    filas = conjunto.indice_codigo.get_indexer(nuevas["CodigoExterno"])
+    # sin fecha actual para los códigos nuevos (filas == -1), también con el
+    # conjunto vacío
+    existentes = filas >= 0
+    fechas = licitaciones["FechaActualizacion"].to_numpy()
+    fecha_actual = np.full(len(filas), np.datetime64("NaT"), dtype=fechas.dtype)
+    fecha_actual[existentes] = fechas[filas[existentes]]
+    fecha_actual = pd.Series(fecha_actual, index=nuevas.index)
+    fecha_nueva = nuevas["FechaActualizacion"]
+    antiguas = fecha_actual.notna() & (fecha_nueva.isna() | (fecha_nueva < fecha_actual))
+    if antiguas.any():
+        codigos_antiguos = nuevas.loc[antiguas, "CodigoExterno"]
+        nuevas = nuevas.loc[~antiguas]
+        nuevos_items = nuevos_items.loc[~nuevos_items["CodigoExterno"].isin(codigos_antiguos)]
+        filas = filas[~antiguas.to_numpy()]
+
+    # comparar solo contra las licitaciones actuales con el mismo código
+    existentes = licitaciones.iloc[filas[filas >= 0]]
+    items_existentes = items.loc[items["CodigoExterno"].isin(existentes["CodigoExterno"])]
+    actuales = huellas_registros(existentes, items_existentes)
+    recibidas = huellas_registros(nuevas, nuevos_items)
+    cambiadas = recibidas.index[~(actuales.reindex(recibidas.index) == recibidas).to_numpy()]
+    if len(cambiadas) == 0:
+        return conjunto.con_version(version, volcados), 0
+
+    quitar = licitaciones["CodigoExterno"].isin(cambiadas).to_numpy()
+    agregadas = nuevas.loc[nuevas["CodigoExterno"].isin(cambiadas)]
+    licitaciones_nuevas, items_nuevos = categorizar(
+        pd.concat([licitaciones.loc[~quitar], agregadas], ignore_index=True),
+        pd.concat(
+            [
+                items.loc[~items["CodigoExterno"].isin(cambiadas)],
+                nuevos_items.loc[nuevos_items["CodigoExterno"].isin(cambiadas)],
+            ],
+            ignore_index=True,
+        ),
+    )
+    licitaciones_nuevas = ordenar_por_fecha(licitaciones_nuevas)
+    cubo = actualizar_cubo(conjunto.cubo, licitaciones.loc[quitar], agregadas, licitaciones_nuevas)
+    diferidas = None
+    if not set(COLUMNAS_DIFERIDAS) <= set(conjunto.licitaciones.columns):
+        # se mantienen fuera de la tabla, como en el conjunto anterior
+        diferidas = licitaciones_nuevas[COLUMNAS_DIFERIDAS]
+        licitaciones_nuevas = licitaciones_nuevas.drop(columns=COLUMNAS_DIFERIDAS)
+    nuevo = ConjuntoDatos(licitaciones_nuevas, items_nuevos, version, volcados, cubo=cubo, diferidas=diferidas)
+    return nuevo, len(cambiadas)
+
+
+class Ingesta:
+    # mantiene el conjunto de datos vigente y aplica los volcados de la carpeta
+
+    def __init__(self, directorio: str = DIR_INGESTA, intervalo: float = INTERVALO_INGESTA,
+                 ruta_base: str | None = None):
+        self.directorio = directorio
+        self.intervalo = intervalo
+        self.ruta_base = ruta_base or ruta_por_defecto()
+        self.huella_base = huella_fuentes(self.ruta_base)
+        self.actual: ConjuntoDatos | None = None
+        self._lock = threading.Lock()
+        self._hilo: threading.Thread | None = None
+        self._suscriptores: list[Callable[[ConjuntoDatos], None]] = []
+        # (ruta, tamaño, fecha de modificación) -> huella, para no releer los volcados en cada revisión
+        self._huellas: dict[tuple, str] = {}
+        # volcados que fallaron; se reintentan solo si el archivo cambia
+        self._fallidos: set[str] = set()
+
+    @classmethod
+    def desde_entorno(cls) -> "Ingesta":
+        return cls(
+            directorio=os.environ.get("INGESTA_DIR", DIR_INGESTA),
+            intervalo=float(os.environ.get("INGESTA_INTERVALO", INTERVALO_INGESTA)),
+        )
+
+    def al_actualizar(self, funcion: Callable[[ConjuntoDatos], None]) -> Callable[[ConjuntoDatos], None]:
+        # registra una función que se llama con cada conjunto nuevo (se puede usar como decorador)
+        self._suscriptores.append(funcion)
+        return funcion
+
+    def volcados(self) -> list[tuple[str, str]]:
+        # (ruta, huella) de los volcados de la carpeta, en orden de nombre
+        if not os.path.isdir(self.directorio):
+            return []
+        resultado = []
+        for nombre in sorted(os.listdir(self.directorio)):
+            ruta = os.path.join(self.directorio, nombre)
+            if not nombre.endswith(EXTENSIONES) or not os.path.isfile(ruta):
+                continue
+            estado = os.stat(ruta)
+            clave = (ruta, estado.st_size, estado.st_mtime_ns)
+            if clave not in self._huellas:
+                self._huellas[clave] = huella_fuente(ruta)
+            resultado.append((ruta, self._huellas[clave]))
+        return resultado
+
+    def cargar(self) -> ConjuntoDatos:
+        # conjunto inicial: caché consolidada si existe; si no, volcado base
+        # más los volcados de la carpeta
+        with self._lock:
+            huellas = tuple(huella for _, huella in self.volcados())
+            version = huella_conjunto(self.huella_base, huellas)
+            rutas = rutas_por_huella(version)
+            if huellas and _hay_pyarrow() and all(os.path.exists(destino) for destino in rutas.values()):
+                tablas = leer_cache(rutas)
+                self._publicar(ConjuntoDatos(tablas["licitaciones"], tablas["items"], version, huellas))
+                return self.actual
+            licitaciones, items = cargar_licitaciones(self.ruta_base)
+            self._publicar(ConjuntoDatos(licitaciones, items, self.huella_base))
+        self.revisar()
+        return self.actual
+
+    def revisar(self) -> int:
+        # aplica los volcados pendientes; devuelve el número de licitaciones nuevas o modificadas
+        with self._lock:
+            conjunto = self.actual
+            aplicados = set(conjunto.volcados)
+            cambios = 0
+            for ruta, huella in self.volcados():
+                if huella in aplicados or huella in self._fallidos:
+                    continue
+                inicio = time.perf_counter()
+                try:
+                    nuevas, nuevos_items = construir_licitaciones(ruta)
+                except Exception:
+                    logger.exception("no se pudo leer el volcado %s", ruta)
+                    self._fallidos.add(huella)
+                    continue
+                conjunto, n = aplicar_volcado(conjunto, nuevas, nuevos_items, huella, self.huella_base)
+                aplicados.add(huella)
+                cambios += n
+                logger.info(
+                    "volcado %s: %d licitaciones nuevas o modificadas (%.2f s)", ruta, n, time.perf_counter() - inicio
+                )
+            if conjunto is self.actual:
+                return 0
+            if _hay_pyarrow():
+                guardar_cache(
+                    {"licitaciones": conjunto.licitaciones_completas(), "items": conjunto.items},
+                    rutas_por_huella(conjunto.version),
+                )
+                # las columnas diferidas se vuelven a leer de la caché recién escrita
+                conjunto._diferidas = None
+            self._publicar(conjunto)
+            return cambios
+
+    def _publicar(self, conjunto: ConjuntoDatos) -> None:
+        # el índice de texto se arma (o se lee de la caché) antes de publicar el conjunto
+        conjunto.texto()
+        # reemplazo atómico: los callbacks leen self.actual una vez por request
+        self.actual = conjunto
+        for funcion in self._suscriptores:
+            funcion(conjunto)
+
+    def iniciar(self) -> None:
+        # revisión periódica de la carpeta en un hilo de fondo
+        if self.intervalo <= 0 or (self._hilo is not None and self._hilo.is_alive()):
+            return
+        self._hilo = threading.Thread(target=self._vigilar, name="ingesta", daemon=True)
+        self._hilo.start()
+
+    def _vigilar(self) -> None:
+        while True:
+            time.sleep(self.intervalo)
+            try:
+                self.revisar()
+            except Exception:
+                logger.exception("error al revisar la carpeta de volcados %s", self.directorio)
+
+
+def _hay_pyarrow() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    ingesta = Ingesta.desde_entorno()
+    conjunto = ingesta.cargar()
+    print(f"versión de datos: {conjunto.version}")
+    print(f"volcados aplicados: {len(conjunto.volcados)}")
+    print(f"licitaciones: {len(conjunto.licitaciones)}")
+    print(f"items: {len(conjunto.items)}")
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+Métricas de tiempo por etapa de los callbacks del dashboard
+
+Cada callback mide sus etapas (filtro, construcción de la figura,
+serialización a JSON y el callback completo, con aciertos de caché
+incluidos), el tamaño del JSON de cada figura y el de cada respuesta de
+callback. Los valores se acumulan en
+histogramas por etapa y gráfico y se exponen en /metrics en formato de texto
+de Prometheus; opcionalmente cada medición se escribe además como una línea
+de log JSON.
+
+Configuración por variables de entorno:
+
+- METRICAS: "1" activa las métricas (desactivadas por defecto; así `etapa`
+  devuelve un contexto vacío y el costo es una llamada de función)
+- METRICAS_LOG: "1" escribe una línea de log JSON por medición (logger "metricas")
+"""
+# librerías
+from __future__ import annotations
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+# límites superiores de los buckets de cada histograma
+BUCKETS = {
+    "dashboard_etapa_segundos": (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+    "dashboard_figura_bytes": (1e3, 1e4, 3e4, 1e5, 3e5, 1e6, 3e6, 1e7),
+    "dashboard_respuesta_bytes": (1e3, 1e4, 3e4, 1e5, 3e5, 1e6, 3e6, 1e7),
+}
+AYUDA = {
+    "dashboard_etapa_segundos": "Duración de cada etapa de los callbacks, por gráfico",
+    "dashboard_figura_bytes": "Tamaño del JSON de cada figura calculada, por gráfico",
+    "dashboard_respuesta_bytes": "Tamaño de cada respuesta de callback sin comprimir, por salida",
+}
+_NULO = nullcontext()
+
+logger = logging.getLogger("metricas")
+
+
+class Metricas:
+
+    def __init__(self, activas: bool = False, log: bool = False):
+        self.activas = activas
+        self.log = log
+        self._lock = threading.Lock()
+        # (métrica, etiquetas ordenadas) -> [conteo por bucket..., suma, conteo]
+        self._series: dict[tuple, list] = {}
+
+    @classmethod
+    def desde_entorno(cls) -> "Metricas":
+        return cls(
+            activas=os.environ.get("METRICAS") == "1",
+            log=os.environ.get("METRICAS_LOG") == "1",
+        )
+
+    def etapa(self, nombre: str, **etiquetas):
+        # contexto que mide la duración de una etapa
+        if not self.activas:
+            return _NULO
+        return self._medir(nombre, etiquetas)
+
+    @contextmanager
+    def _medir(self, nombre: str, etiquetas: dict):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar("dashboard_etapa_segundos", time.perf_counter() - inicio, etapa=nombre, **etiquetas)
+
+    def observar(self, metrica: str, valor: float, **etiquetas) -> None:
+        if not self.activas:
+            return
+        limites = BUCKETS[metrica]
+        clave = (metrica, tuple(sorted(etiquetas.items())))
+        with self._lock:
+            serie = self._series.get(clave)
+            if serie is None:
+                serie = self._series[clave] = [0] * (len(limites) + 2)
+            for i, limite in enumerate(limites):
+                if valor <= limite:
+                    serie[i] += 1
+            serie[-2] += valor
+            serie[-1] += 1
+        if self.log:
+            logger.info(json.dumps({"metrica": metrica, "valor": round(valor, 6), **etiquetas}, ensure_ascii=False))
+
+    def exponer(self, contadores: dict[str, float] | None = None) -> str:
+        # texto en formato de exposición de Prometheus
+        with self._lock:
+            series = sorted((clave, list(serie)) for clave, serie in self._series.items())
+        lineas = []
+        anterior = None
+        for (metrica, etiquetas), serie in series:
+            if metrica != anterior:
+                lineas.append(f"# HELP {metrica} {AYUDA[metrica]}")
+                lineas.append(f"# TYPE {metrica} histogram")
+                anterior = metrica
+            base = ",".join(f'{k}="{_escapar(v)}"' for k, v in etiquetas)
+            separador = "," if base else ""
+            for limite, conteo in zip(BUCKETS[metrica], serie):
+                lineas.append(f'{metrica}_bucket{{{base}{separador}le="{limite:g}"}} {conteo}')
+            lineas.append(f'{metrica}_bucket{{{base}{separador}le="+Inf"}} {serie[-1]}')
+            lineas.append(f"{metrica}_sum{{{base}}} {serie[-2]:.6f}")
+            lineas.append(f"{metrica}_count{{{base}}} {serie[-1]}")
+        for nombre, valor in (contadores or {}).items():
+            lineas.append(f"# TYPE {nombre} counter")
+            lineas.append(f"{nombre} {valor}")
+        return "\n".join(lineas) + "\n"
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# instancia del proceso, compartida por la app y la caché de figuras
+metricas = Metricas.desde_entorno()
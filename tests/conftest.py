@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+Fixtures compartidas de las pruebas
+
+Las pruebas se ejecutan desde la raíz del repositorio con `python -m pytest`;
+los volcados de prueba se arman con las primeras licitaciones del volcado de
+ejemplo (json_detalles_MP.zip). La app de las pruebas carga uno de esos
+volcados, con la caché y la carpeta de ingesta en un directorio temporal.
+"""
+# librerías
+import copy
+import itertools
+import json
+import os
+import sys
+import tempfile
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+os.chdir(RAIZ)
+# las cachés y volcados de las pruebas no se mezclan con los de la app
+TEMPORAL = tempfile.mkdtemp(prefix="pruebas-")
+os.environ["CACHE_LICITACIONES"] = os.path.join(TEMPORAL, "cache")
+os.environ["FUENTE_DETALLES"] = os.path.join(TEMPORAL, "base.json")
+os.environ["INGESTA_DIR"] = os.path.join(TEMPORAL, "nuevos")
+os.environ["PRECALENTAR"] = "0"
+
+from carga_datos import RUTA_ZIP, leer_detalles  # noqa: E402
+
+
+def _con_items(entrada) -> bool:
+    detalle = entrada.get("detalle", {})
+    return bool(detalle.get("Items", {}).get("Listado")) and str(detalle.get("Fechas", {}).get("FechaPublicacion", "")) >= "2025"
+
+
+# fechas de actualización (milisegundos) para armar versiones de una licitación
+T0, ANTES, DESPUES = 1_700_000_000_000, 1_600_000_000_000, 1_800_000_000_000
+
+
+def con_fecha(entrada: dict, milisegundos: int | None) -> dict:
+    # fija fecha_detalle_actualizado de la entrada (None la quita)
+    if milisegundos is None:
+        entrada.pop("fecha_detalle_actualizado", None)
+    else:
+        entrada["fecha_detalle_actualizado"] = {"$date": {"$numberLong": str(milisegundos)}}
+    return entrada
+
+
+def otra_version(entrada: dict, monto: float, milisegundos: int | None) -> dict:
+    # copia de la entrada con otro monto, solo su primer item y la fecha dada
+    entrada = copy.deepcopy(entrada)
+    entrada["detalle"]["MontoEstimado"] = monto
+    entrada["detalle"]["Items"]["Listado"] = entrada["detalle"]["Items"]["Listado"][:1]
+    return con_fecha(entrada, milisegundos)
+
+
+@pytest.fixture(scope="session")
+def entradas_base() -> list[dict]:
+    # 200 licitaciones con items dentro de la ventana de carga
+    return list(itertools.islice(filter(_con_items, leer_detalles(RUTA_ZIP)), 200))
+
+
+@pytest.fixture(scope="session")
+def app(entradas_base):
+    # módulo app cargado con las licitaciones de entradas_base
+    with open(os.environ["FUENTE_DETALLES"], "w", encoding="utf-8") as archivo:
+        json.dump(entradas_base, archivo)
+    import app
+
+    return app
+
+
+@pytest.fixture
+def entradas(entradas_base) -> list[dict]:
+    # copia que cada prueba puede modificar
+    return copy.deepcopy(entradas_base)
+
+
+@pytest.fixture
+def escribir_volcado(tmp_path):
+    # escribe una lista de entradas como volcado .json y devuelve su ruta
+    def escribir(entradas, nombre="volcado.json") -> str:
+        ruta = tmp_path / nombre
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        ruta.write_text(json.dumps(entradas), encoding="utf-8")
+        return str(ruta)
+
+    return escribir
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+Almacén DuckDB: mismas licitaciones que el motor en memoria
+"""
+# librerías
+import pytest
+
+from carga_datos import construir_licitaciones
+from conftest import ANTES, DESPUES, T0, con_fecha, otra_version
+
+duckdb = pytest.importorskip("duckdb")
+
+from almacen import construir_almacen  # noqa: E402
+
+
+def test_versiones_como_en_memoria(entradas, escribir_volcado, tmp_path):
+    base = [con_fecha(entrada, T0) for entrada in entradas[:150]]
+    nuevo = [otra_version(base[i], 111.0 * (i + 1), fecha) for i, fecha in enumerate([DESPUES, ANTES, T0, None])]
+    # repetida dentro del volcado base
+    base.append(otra_version(nuevo[0], 111.0, T0))
+    fuentes = [escribir_volcado(base, "todos/a.json"), escribir_volcado(nuevo + entradas[150:160], "todos/b.json")]
+    destino = str(tmp_path / "almacen.duckdb")
+
+    construir_almacen(fuentes, destino)
+    licitaciones, items = construir_licitaciones(str(tmp_path / "todos"), procesos=1)
+
+    con = duckdb.connect(destino, read_only=True)
+    almacen = con.sql("SELECT CodigoExterno, MontoEstimado FROM licitaciones").df()
+    monto = almacen.set_index("CodigoExterno")["MontoEstimado"].sort_index()
+    assert monto.equals(licitaciones.set_index("CodigoExterno")["MontoEstimado"].astype(monto.dtype).sort_index())
+    por_codigo = con.sql("SELECT CodigoExterno, count(*) AS n FROM items GROUP BY 1").df().set_index("CodigoExterno")["n"]
+    assert por_codigo.sort_index().tolist() == items["CodigoExterno"].astype(str).value_counts().sort_index().tolist()
+
+
+@pytest.mark.parametrize("maximo", [10, 20, 5000])
+def test_muestra_scatter_como_en_memoria(app, tmp_path, monkeypatch, maximo):
+    from almacen import AlmacenDuckDB
+
+    destino = str(tmp_path / "almacen.duckdb")
+    construir_almacen([app.ingesta.ruta_base], destino)
+    almacen = AlmacenDuckDB(destino, "prueba")
+    monkeypatch.setattr(app, "SCATTER_MAX_PUNTOS", maximo)
+    for filtros in ([], [], [], [], None, None, None), ([], [], [], [], "2025-01-01", "2025-03-01", None):
+        muestra, total = app.puntos_scatter(app.ingesta.actual, *filtros)
+        muestra_almacen, total_almacen = app.puntos_scatter(almacen, *filtros)
+        assert total_almacen == total
+        assert len(muestra) == total if total <= maximo else len(muestra) < total
+        assert muestra_almacen["CodigoExterno"].tolist() == muestra["CodigoExterno"].tolist()
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""
+Versiones de la caché en disco
+"""
+# librerías
+import os
+
+import carga_datos
+from carga_datos import construir_licitaciones, eliminar_versiones_antiguas, guardar_cache, rutas_por_huella
+from ingesta import ConjuntoDatos
+
+
+def _tocar(ruta, segundos: int) -> str:
+    ruta.write_bytes(b"")
+    os.utime(ruta, (segundos, segundos))
+    return str(ruta)
+
+
+def test_conserva_las_versiones_mas_recientes(tmp_path, monkeypatch):
+    monkeypatch.setattr(carga_datos, "CACHE_VERSIONES", 2)
+    for segundos, huella in enumerate(["a", "b", "c", "d"]):
+        for tabla in ("licitaciones", "items"):
+            _tocar(tmp_path / f"{tabla}-{huella}.arrow", 1000 + segundos)
+    _tocar(tmp_path / "texto-a.arrow", 1)
+    _tocar(tmp_path / "licitaciones-e.arrow.123.tmp", 1)
+
+    # la vigente (b) se conserva aunque no sea la más reciente, más la anterior más reciente (d)
+    eliminar_versiones_antiguas(str(tmp_path / "licitaciones-b.arrow"), ("licitaciones", "items"))
+
+    assert sorted(os.listdir(tmp_path)) == [
+        "items-b.arrow", "items-d.arrow", "licitaciones-b.arrow", "licitaciones-d.arrow",
+        "licitaciones-e.arrow.123.tmp", "texto-a.arrow",
+    ]
+
+
+def test_diferidas_sin_cache_no_se_guardan(entradas, escribir_volcado):
+    licitaciones, items = construir_licitaciones(escribir_volcado(entradas))
+    conjunto = ConjuntoDatos(licitaciones.drop(columns="Descripcion"), items, "sin-cache")
+
+    # sin el archivo: columnas vacías, que no quedan en el conjunto
+    assert conjunto.diferidas()["Descripcion"].isna().all()
+    assert conjunto._diferidas is None
+
+    # con la caché escrita después se leen del archivo
+    guardar_cache({"licitaciones": licitaciones, "items": items}, rutas_por_huella("sin-cache"))
+    assert conjunto.diferidas()["Descripcion"].equals(licitaciones["Descripcion"])
+    assert conjunto._diferidas is not None
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+Caché de figuras: memoria sin serializar y JSON solo en disco
+"""
+# librerías
+import json
+
+import plotly.express as px
+import plotly.io as pio
+
+import cache_figuras
+from cache_figuras import CacheFiguras
+
+
+def _figura():
+    return px.bar(x=["a", "b"], y=[1, 2])
+
+
+def test_memoria_sin_serializar(monkeypatch):
+    def to_json(*args, **kwargs):
+        raise AssertionError("la figura no se serializa sin nivel en disco")
+
+    monkeypatch.setattr(cache_figuras.pio, "to_json", to_json)
+    cache = CacheFiguras(maximo=4)
+    calculos = []
+
+    def calcular():
+        calculos.append(1)
+        return _figura()
+
+    primera = cache.obtener_o_calcular(("bar", "v1"), calcular)
+    segunda = cache.obtener_o_calcular(("bar", "v1"), calcular)
+
+    assert isinstance(primera, dict) and segunda is primera and len(calculos) == 1
+    assert cache.estadisticas()["fallos"] == 1 and cache.estadisticas()["aciertos_memoria"] == 1
+
+
+def test_disco_compartido(tmp_path):
+    escritora = CacheFiguras(maximo=4, directorio=str(tmp_path))
+    figura = escritora.obtener_o_calcular(("bar", "v1"), _figura)
+
+    lectora = CacheFiguras(maximo=4, directorio=str(tmp_path))
+    leida = lectora.obtener_o_calcular(("bar", "v1"), lambda: None)
+
+    assert lectora.estadisticas()["aciertos_disco"] == 1
+    assert leida == json.loads(pio.to_json(figura, validate=False))
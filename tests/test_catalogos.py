@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+Figuras de regiones y tipos contra las traducciones originales fila por fila
+"""
+# librerías
+import numpy as np
+import pandas as pd
+import pytest
+
+from carga_datos import construir_licitaciones
+from ingesta import ConjuntoDatos
+
+# catálogos y clasificación del app.py original
+region_roman = {
+    "Región de Arica y Parinacota": "XV",
+    "Región de Tarapacá": "I",
+    "Región de Antofagasta": "II",
+    "Región de Atacama": "III",
+    "Región de Coquimbo": "IV",
+    "Región de Valparaíso": "V",
+    "Región Metropolitana de Santiago": "RM",
+    "Región del Libertador General Bernardo O´Higgins": "VI",
+    "Región del Maule": "VII",
+    "Región de Ñuble": "XVI",
+    "Región del Biobío": "VIII",
+    "Región de la Araucanía": "IX",
+    "Región de Los Ríos": "XIV",
+    "Región de los Lagos": "X",
+    "Región de Aysén del General Carlos Ibáñez del Campo": "XI",
+    "Región de Magallanes y de la Antártica": "XII",
+}
+tipo_map = {
+    "L1": "LP <100 UTM",
+    "LE": "LP 100‑1k",
+    "LP": "LP 1k‑2k",
+    "LQ": "LP 2k‑5k",
+    "LR": "LP >5k",
+    "E2": "LPriv <100",
+    "CO": "LPriv 100‑1k",
+    "B2": "LPriv 1k‑2k",
+    "H2": "LPriv 2k‑5k",
+    "I2": "LPriv >5k",
+    "LS": "LP Serv. pers.",
+}
+mapeo_regiones = {
+    "Región de la Araucanía": "Región de La Araucanía",
+    "Región Metropolitana de Santiago": "Región Metropolitana de Santiago",
+    "Región de Coquimbo": "Región de Coquimbo",
+    "Región del Maule": "Región del Maule",
+    "Región Aysén del General Carlos Ibáñez del Campo": "Región de Aysén del Gral.Ibañez del Campo",
+    "Región de Tarapacá": "Región de Tarapacá",
+    "Región de Atacama": "Región de Atacama",
+    "Región de Valparaíso": "Región de Valparaíso",
+    "Región de Magallanes y de la Antártica": "Región de Magallanes y Antártica Chilena",
+    "Región del Biobío": "Región del Bío-Bío",
+    "Región del Libertador General Bernardo O´Higgins": "Región del Libertador Bernardo O'Higgins",
+    "Región de Los Ríos": "Región de Los Ríos",
+    "Región del Ñuble": "Región de Ñuble",
+    "Región de los Lagos": "Región de Los Lagos",
+    "Región de Antofagasta": "Región de Antofagasta",
+    "Región de Arica y Parinacota": "Región de Arica y Parinacota",
+}
+PUBLICOS = ["L1", "LE", "LP", "LQ", "LR", "LS"]
+PRIVADOS = ["E2", "CO", "B2", "H2", "I2"]
+
+
+def clasificar_tipo(codigo):
+    if codigo in PUBLICOS:
+        return "Público"
+    elif codigo in PRIVADOS:
+        return "Privado"
+    else:
+        return "Otro"
+
+
+@pytest.fixture
+def licitaciones(entradas, escribir_volcado):
+    # tipos y regiones nulos o fuera de los catálogos, y una licitación sin monto
+    entradas[0]["detalle"].pop("Tipo", None)
+    entradas[1]["detalle"]["Tipo"] = "ZZ"
+    entradas[2]["detalle"]["Comprador"]["RegionUnidad"] = None
+    entradas[3]["detalle"]["Comprador"]["RegionUnidad"] = "Región de Prueba"
+    entradas[4]["detalle"]["Comprador"]["RegionUnidad"] = "Región de Prueba"
+    entradas[5]["detalle"]["MontoEstimado"] = None
+    return construir_licitaciones(escribir_volcado(entradas))
+
+
+@pytest.fixture(params=["pandas", "duckdb"])
+def datos(request, licitaciones, tmp_path):
+    # el mismo volcado (escrito por el fixture licitaciones) en cada motor
+    if request.param == "pandas":
+        return ConjuntoDatos(*licitaciones, "catalogos")
+    pytest.importorskip("duckdb")
+    from almacen import AlmacenDuckDB, construir_almacen
+
+    destino = str(tmp_path / "almacen-catalogos.duckdb")
+    construir_almacen([str(tmp_path / "volcado.json")], destino)
+    return AlmacenDuckDB(destino, "catalogos")
+
+
+def _conteos(nombres, valores) -> dict:
+    return {nombre: int(valor) for nombre, valor in zip(nombres, valores)}
+
+
+def _texto(valor):
+    # None y NaN cuentan como el mismo valor faltante
+    return None if pd.isna(valor) else valor
+
+
+def test_barras_por_region(app, datos, licitaciones):
+    tabla = licitaciones[0]
+    esperado = tabla.groupby("Region", dropna=False)["CodigoExterno"].count()
+    figura = app.figura_region(datos, [])
+    barras = figura.data[0]
+
+    obtenido = {
+        (_texto(region), _texto(romano)): int(n) for (region,), romano, n in zip(barras.customdata, barras.x, barras.y)
+    }
+    assert obtenido == {(_texto(region), region_roman.get(region)): int(n) for region, n in esperado.items()}
+    assert (None, None) in obtenido and ("Región de Prueba", None) in obtenido
+    assert (np.diff(np.asarray(barras.y, dtype=float)) <= 0).all()
+
+
+@pytest.mark.parametrize("tipo_toggle", ["grupo", "privado", "publico"])
+def test_torta_por_tipo(app, datos, licitaciones, tipo_toggle):
+    tipos = licitaciones[0]["Tipo"]
+    if tipo_toggle == "grupo":
+        esperado = tipos.map(clasificar_tipo).value_counts()
+    else:
+        seleccion = tipos[tipos.isin(PRIVADOS if tipo_toggle == "privado" else PUBLICOS)]
+        esperado = seleccion.map(tipo_map).fillna("Otro").value_counts()
+    figura = app.figura_pie(app.tabla_agregada(datos, [], [], [], [], None, None), tipo_toggle)
+    torta = figura.data[0]
+
+    assert _conteos(torta.labels, torta.values) == _conteos(esperado.index, esperado.to_numpy())
+    assert (np.diff(np.asarray(torta.values, dtype=float)) <= 0).all()
+
+
+def test_mapa_por_region(app, datos, licitaciones):
+    tabla = licitaciones[0].dropna(subset=["Region", "MontoEstimado"])
+    region = tabla["Region"].map(mapeo_regiones).fillna(tabla["Region"]).str.strip()
+    esperado = tabla["MontoEstimado"].groupby(region).sum()
+    figura = app.figura_mapa(datos)
+    mapa = figura.data[0]
+
+    obtenido = pd.Series(np.asarray(mapa.z, dtype=float), index=list(mapa.locations)).sort_index()
+    pd.testing.assert_series_equal(obtenido, esperado.sort_index().rename(None).rename_axis(None), check_exact=False)
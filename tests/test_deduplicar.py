@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+Una fila por CodigoExterno al cargar, también con un solo volcado
+"""
+# librerías
+import pytest
+
+from carga_datos import construir_licitaciones
+from conftest import ANTES, DESPUES, T0, con_fecha, otra_version
+from ingesta import ConjuntoDatos
+
+
+def test_un_volcado_con_repetidas(entradas, escribir_volcado):
+    for entrada in entradas:
+        con_fecha(entrada, T0)
+    # misma fecha: vale la última; fecha más nueva: vale esa aunque venga antes;
+    # fecha más antigua: se conserva la original
+    misma = otra_version(entradas[0], 111.0, T0)
+    nueva = otra_version(entradas[1], 222.0, DESPUES)
+    antigua = otra_version(entradas[2], 333.0, ANTES)
+    ruta = escribir_volcado([nueva] + entradas + [misma, antigua])
+
+    licitaciones, items = construir_licitaciones(ruta)
+
+    assert licitaciones["CodigoExterno"].is_unique
+    assert len(licitaciones) == len(entradas)
+    monto = licitaciones.set_index("CodigoExterno")["MontoEstimado"]
+    codigos = [entradas[i]["detalle"]["CodigoExterno"] for i in range(3)]
+    assert monto[codigos[0]] == 111.0
+    assert monto[codigos[1]] == 222.0
+    assert monto[codigos[2]] != 333.0
+    # items solo de la versión conservada
+    por_codigo = items["CodigoExterno"].astype(str).value_counts()
+    assert por_codigo[codigos[0]] == 1
+    assert por_codigo[codigos[1]] == 1
+    assert por_codigo[codigos[2]] == len(entradas[2]["detalle"]["Items"]["Listado"])
+    assert "_fila" not in items.columns and "_fuente" not in licitaciones.columns
+
+    ConjuntoDatos(licitaciones, items, "prueba")
+
+
+def test_conjunto_rechaza_codigos_repetidos(entradas, escribir_volcado):
+    licitaciones, items = construir_licitaciones(escribir_volcado(entradas))
+    repetidas = licitaciones.iloc[[0, 1, 1]].reset_index(drop=True)
+    with pytest.raises(ValueError, match="CodigoExterno repetido"):
+        ConjuntoDatos(repetidas, items, "prueba")
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+Ingesta incremental: el resultado es el mismo que cargar todos los volcados juntos
+"""
+# librerías
+import os
+
+from carga_datos import construir_licitaciones
+from conftest import ANTES, DESPUES, T0, con_fecha, otra_version
+from ingesta import Ingesta
+
+
+def test_volcado_con_versiones_antiguas(entradas, escribir_volcado, tmp_path):
+    base = entradas[:150]
+    for entrada in base:
+        con_fecha(entrada, T0)
+    nuevo = [
+        otra_version(base[0], 111.0, DESPUES),  # más nueva: reemplaza
+        otra_version(base[1], 222.0, ANTES),  # más antigua: se ignora
+        otra_version(base[2], 333.0, T0),  # misma fecha: vale el volcado posterior
+        otra_version(base[3], 444.0, None),  # sin fecha: cuenta como la más antigua
+        *entradas[150:160],  # licitaciones nuevas
+    ]
+    ruta_base = escribir_volcado(base, "todos/a.json")
+    ruta_nuevo = escribir_volcado(nuevo, "todos/b.json")
+    os.makedirs(tmp_path / "nuevos")
+    os.link(ruta_nuevo, tmp_path / "nuevos" / "b.json")
+
+    ingesta = Ingesta(directorio=str(tmp_path / "nuevos"), intervalo=0, ruta_base=ruta_base)
+    conjunto = ingesta.cargar()
+    licitaciones, items = construir_licitaciones(str(tmp_path / "todos"), procesos=1)
+
+    monto = conjunto.licitaciones.set_index("CodigoExterno")["MontoEstimado"]
+    original = construir_licitaciones(ruta_base)[0].set_index("CodigoExterno")["MontoEstimado"]
+    codigos = [entrada["detalle"]["CodigoExterno"] for entrada in base[:4]]
+    esperado = original[codigos].copy()
+    esperado.iloc[[0, 2]] = [111.0, 333.0]
+    assert monto[codigos].equals(esperado)
+    # mismas licitaciones e items que la carga conjunta
+    esperado = licitaciones.set_index("CodigoExterno")["MontoEstimado"]
+    assert monto.sort_index().equals(esperado.sort_index())
+    por_codigo = conjunto.items["CodigoExterno"].astype(str).value_counts().sort_index()
+    assert por_codigo.equals(items["CodigoExterno"].astype(str).value_counts().sort_index())
+
+
+def test_volcado_sobre_conjunto_vacio(entradas, escribir_volcado, tmp_path):
+    ruta_base = escribir_volcado([], "vacio.json")
+    ruta_nuevo = escribir_volcado(entradas[:50], "nuevos/a.json")
+
+    ingesta = Ingesta(directorio=str(tmp_path / "nuevos"), intervalo=0, ruta_base=ruta_base)
+    conjunto = ingesta.cargar()
+    licitaciones, items = construir_licitaciones(ruta_nuevo)
+
+    assert conjunto.volcados and len(conjunto.licitaciones) == len(licitaciones) > 0
+    assert set(conjunto.licitaciones["CodigoExterno"]) == set(licitaciones["CodigoExterno"])
+    assert len(conjunto.items) == len(items)
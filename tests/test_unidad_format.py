@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""
+Duración del contrato en días (unidad_format) contra el cálculo original
+"""
+# librerías
+import numpy as np
+import pandas as pd
+
+from carga_datos import aplanar, normalizar
+
+
+def unidad_format_original(df: pd.DataFrame) -> pd.Series:
+    # las cuatro pasadas fila a fila del app.py original
+    df = df.copy()
+    df['unidad_format'] = df.apply(lambda x: x['TiempoDuracionContrato']/24 if x['UnidadTiempoDuracionContrato'] == 1 else x['TiempoDuracionContrato'],axis=1)
+    df['unidad_format'] = df.apply(lambda x: x['TiempoDuracionContrato']*7 if x['UnidadTiempoDuracionContrato'] == 3 else x['unidad_format'],axis=1)
+    df['unidad_format'] = df.apply(lambda x: x['TiempoDuracionContrato']*30 if x['UnidadTiempoDuracionContrato'] == 4 else x['unidad_format'],axis=1)
+    df['unidad_format'] = df.apply(lambda x: x['TiempoDuracionContrato']*365 if x['UnidadTiempoDuracionContrato'] == 5 else x['unidad_format'],axis=1)
+    return df['unidad_format']
+
+
+def test_unidad_format_como_el_original(entradas):
+    rng = np.random.default_rng(0)
+    licitaciones, items = aplanar(entradas)
+    licitaciones, items = pd.DataFrame(licitaciones), pd.DataFrame(items)
+    n = len(licitaciones)
+    # códigos conocidos (1 a 5), desconocidos (-1, 0, 6 a 9) y duraciones de 0 a 1000
+    licitaciones["UnidadTiempoDuracionContrato"] = rng.integers(-1, 10, n)
+    licitaciones["TiempoDuracionContrato"] = rng.integers(0, 1001, n)
+    esperado = unidad_format_original(licitaciones.astype({
+        "UnidadTiempoDuracionContrato": int, "TiempoDuracionContrato": int,
+    }))
+
+    normalizadas, _ = normalizar(licitaciones, items)
+
+    assert len(normalizadas) == n
+    np.testing.assert_array_equal(normalizadas["unidad_format"].to_numpy(), esperado.astype(float).to_numpy())
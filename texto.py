@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+Índice de texto para el filtro de palabras clave
+
+Los textos de NombreLicitacion, Descripcion y NombreProducto (de los items) se
+separan en palabras en minúsculas y sin tildes; cada palabra apunta a las
+filas de la tabla de licitaciones donde aparece, sin repetir. Una búsqueda
+selecciona las licitaciones que contienen todas sus palabras, cada una como
+prefijo ("hosp" encuentra "hospital"): el vocabulario está ordenado, así las
+palabras con un prefijo son un tramo contiguo que se ubica con búsqueda
+binaria, y sus filas también.
+
+El índice se construye una vez por conjunto de datos y se guarda en la caché
+(texto-<huella>.arrow, una lista de filas por palabra) para leerlo mapeado en
+memoria en los arranques siguientes.
+"""
+# librerías
+from __future__ import annotations
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from carga_datos import DIR_CACHE, eliminar_versiones_antiguas
+from indices import plegar
+
+# palabras demasiado frecuentes para filtrar; se ignoran al indexar y al buscar
+PALABRAS_VACIAS = frozenset(
+    "a al ante con de del el en entre la las lo los o para por se sin su sus u un una y".split()
+)
+_PALABRA = re.compile(r"[a-z0-9]+")
+
+
+def tokenizar(texto) -> list[str]:
+    # palabras del texto plegado, sin palabras vacías ni letras sueltas
+    if not isinstance(texto, str):
+        return []
+    return [p for p in _PALABRA.findall(plegar(texto)) if len(p) > 1 and p not in PALABRAS_VACIAS]
+
+
+def _palabras(columna: pd.Series) -> pd.Series:
+    # lista de palabras por fila; las categóricas se separan una vez por categoría
+    if isinstance(columna.dtype, pd.CategoricalDtype):
+        por_categoria = pd.Series([tokenizar(valor) for valor in columna.cat.categories] + [[]], dtype=object)
+        codigos = columna.cat.codes.to_numpy()
+        return pd.Series(por_categoria.to_numpy()[codigos], index=columna.index)
+    plegadas = (
+        columna.fillna("").astype(str).str.normalize("NFKD")
+        .str.encode("ascii", "ignore").str.decode("ascii").str.lower()
+    )
+    return plegadas.str.findall(_PALABRA.pattern)
+
+
+class IndiceTexto:
+    # palabra -> filas de licitaciones, en formato comprimido: vocabulario
+    # ordenado, límites de cada palabra y filas concatenadas
+
+    def __init__(self, vocabulario: np.ndarray, limites: np.ndarray, posiciones: np.ndarray, n_filas: int):
+        self.vocabulario = vocabulario
+        self.limites = limites
+        self.posiciones = posiciones
+        self.n_filas = n_filas
+
+    @classmethod
+    def construir(cls, licitaciones: pd.DataFrame, descripciones: pd.DataFrame, items: pd.DataFrame) -> "IndiceTexto":
+        n_filas = len(licitaciones)
+        filas = np.arange(n_filas)
+        filas_items = pd.Index(licitaciones["CodigoExterno"]).get_indexer(items["CodigoExterno"])
+        partes = []
+        for columna, destino in (
+            (licitaciones["NombreLicitacion"], filas),
+            (descripciones["Descripcion"].set_axis(licitaciones.index), filas),
+            (items["NombreProducto"], filas_items),
+        ):
+            palabras = _palabras(columna.reset_index(drop=True)).explode()
+            partes.append(pd.DataFrame({"palabra": palabras.to_numpy(), "fila": destino[palabras.index.to_numpy()]}))
+        pares = pd.concat(partes, ignore_index=True).dropna()
+        pares = pares.loc[
+            (pares["fila"] >= 0) & (pares["palabra"].str.len() > 1) & ~pares["palabra"].isin(PALABRAS_VACIAS)
+        ]
+        codigos, vocabulario = pd.factorize(pares["palabra"], sort=True)
+        # pares (palabra, fila) únicos y ordenados en un solo entero
+        unicos = np.unique(codigos.astype(np.int64) * max(n_filas, 1) + pares["fila"].to_numpy(dtype=np.int64))
+        codigos_ordenados = unicos // max(n_filas, 1)
+        return cls(
+            np.asarray(vocabulario, dtype=object),
+            np.searchsorted(codigos_ordenados, np.arange(len(vocabulario) + 1)),
+            (unicos % max(n_filas, 1)).astype(np.int32),
+            n_filas,
+        )
+
+    def filas(self, prefijo: str) -> np.ndarray:
+        # filas de las palabras que empiezan con el prefijo (pueden repetirse)
+        inicio = np.searchsorted(self.vocabulario, prefijo, side="left")
+        termino = np.searchsorted(self.vocabulario, prefijo + "\x7f", side="left")
+        return self.posiciones[self.limites[inicio]:self.limites[termino]]
+
+    def mascara(self, consulta: str) -> np.ndarray:
+        # licitaciones con todas las palabras de la consulta
+        mascara = np.ones(self.n_filas, dtype=bool)
+        for palabra in tokenizar(consulta):
+            contiene = np.zeros(self.n_filas, dtype=bool)
+            contiene[self.filas(palabra)] = True
+            mascara &= contiene
+        return mascara
+
+    def guardar(self, ruta: str) -> None:
+        import pyarrow as pa
+        from pyarrow import feather
+
+        tabla = pa.table({
+            "palabra": pa.array(self.vocabulario, type=pa.string()),
+            "filas": pa.ListArray.from_arrays(pa.array(self.limites, type=pa.int32()), pa.array(self.posiciones)),
+        })
+        os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+        temporal = f"{ruta}.{os.getpid()}.tmp"
+        feather.write_feather(tabla, temporal, compression="uncompressed")
+        os.replace(temporal, ruta)
+        # eliminar índices de conjuntos anteriores (se conservan los más recientes)
+        eliminar_versiones_antiguas(ruta, ("texto",))
+
+    @classmethod
+    def leer(cls, ruta: str, n_filas: int) -> "IndiceTexto":
+        # límites y filas quedan mapeados en memoria; el vocabulario se copia
+        from pyarrow import feather
+
+        tabla = feather.read_table(ruta, memory_map=True)
+        filas = tabla.column("filas").combine_chunks()
+        return cls(
+            tabla.column("palabra").to_numpy(zero_copy_only=False).astype(object),
+            filas.offsets.to_numpy(),
+            filas.values.to_numpy(),
+            n_filas,
+        )
+
+
+def ruta_indice_texto(huella: str) -> str:
+    return os.path.join(DIR_CACHE, f"texto-{huella}.arrow")
@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+"""
+Punto de entrada WSGI del dashboard para producción
+
+Expone el servidor Flask de la app Dash. Con gunicorn y preload_app (ver
+gunicorn.conf.py) el módulo app se importa una sola vez en el proceso
+maestro: el volcado se carga y se normaliza una vez, y los workers creados
+con fork comparten esas tablas en memoria (copy-on-write) en vez de
+construir cada uno la suya.
+
+    gunicorn -c gunicorn.conf.py wsgi:server
+"""
+# librerías
+from app import app, ingesta  # noqa: F401
+
+server = app.server